@@ -88,6 +88,17 @@ options:
     required: false
     default: null
     version_added: "2.0"
+  manifest:
+    description:
+      - Keep a manifest of the fragments next to C(dest) (C(.<dest name>.assemble)), with the
+        name, size and mtime of each fragment and the state of C(dest) after assembling.
+      - When neither the fragments, the options nor C(dest) changed since, the file is not
+        assembled again and no fragment is read.
+      - Only supported with C(remote_src=yes). With C(remote_src=no) the file is assembled on the
+        controller and installed by the copy or file module, which do not know this option.
+    required: false
+    default: false
+    version_added: "2.3"
 author: "Stephen Fromm (@sfromm)"
 extends_documentation_fragment:
     - files
@@ -110,36 +121,68 @@ EXAMPLES = '''
     src: /etc/ssh/conf.d/
     dest: /etc/ssh/sshd_config
     validate: '/usr/sbin/sshd -t -f %s'
+
+# Only assemble again when a fragment was added, removed or changed
+- assemble:
+    src: /etc/someapp/conf.d
+    dest: /etc/someapp/someapp.conf
+    remote_src: yes
+    manifest: yes
 '''
 
 import codecs
 import os
 import os.path
 import re
+import stat
 import tempfile
 
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.pycompat24 import get_exception
 from ansible.module_utils.six import b
 
 
+# read size used when copying fragments
+BUFSIZE = 64 * 1024
+
+
 # ===========================================
 # Support method
 
-def assemble_from_fragments(src_path, delimiter=None, compiled_regexp=None, ignore_hidden=False):
+def fragment_list(src_path, compiled_regexp=None, ignore_hidden=False):
+    ''' Return (path, stat) of the fragments to assemble, in order '''
+    fragments = []
+    for f in sorted(os.listdir(src_path)):
+        if compiled_regexp and not compiled_regexp.search(f):
+            continue
+        fragment = u"%s/%s" % (src_path, f)
+        if ignore_hidden and os.path.basename(fragment).startswith('.'):
+            continue
+        try:
+            st = os.stat(fragment)
+        except OSError:
+            continue
+        if stat.S_ISREG(st.st_mode):
+            fragments.append((fragment, st))
+    return fragments
+
+
+def assemble_from_fragments(src_path, delimiter=None, compiled_regexp=None, ignore_hidden=False, fragments=None):
     ''' assemble a file from a directory of fragments '''
+    if fragments is None:
+        fragments = fragment_list(src_path, compiled_regexp, ignore_hidden)
+
     tmpfd, temp_path = tempfile.mkstemp()
     tmp = os.fdopen(tmpfd, 'wb')
     delimit_me = False
     add_newline = False
 
-    for f in sorted(os.listdir(src_path)):
-        if compiled_regexp and not compiled_regexp.search(f):
-            continue
-        fragment = u"%s/%s" % (src_path, f)
-        if not os.path.isfile(fragment) or (ignore_hidden and os.path.basename(fragment).startswith('.')):
-            continue
-        fragment_content = open(fragment, 'rb').read()
+    for fragment, st in fragments:
 
         # always put a newline between fragments if the previous fragment didn't end with a newline.
         if add_newline:
@@ -156,9 +199,19 @@ def assemble_from_fragments(src_path, delimiter=None, compiled_regexp=None, igno
                 if delimiter[-1] != b('\n'):
                     tmp.write(b('\n'))
 
-        tmp.write(fragment_content)
+        # stream the fragment, only its last bytes matter for the newline
+        last = b('')
+        fragment_file = open(fragment, 'rb')
+        try:
+            data = fragment_file.read(BUFSIZE)
+            while data:
+                tmp.write(data)
+                last = data
+                data = fragment_file.read(BUFSIZE)
+        finally:
+            fragment_file.close()
         delimit_me = True
-        if fragment_content.endswith(b('\n')):
+        if last.endswith(b('\n')):
             add_newline = False
         else:
             add_newline = True
@@ -167,6 +220,56 @@ def assemble_from_fragments(src_path, delimiter=None, compiled_regexp=None, igno
     return temp_path
 
 
+def manifest_path(dest):
+    return os.path.join(os.path.dirname(dest), '.%s.assemble' % os.path.basename(dest))
+
+
+def fingerprint(fragments, params, dest):
+    '''
+    What a manifest records: name, size, mtime and inode of every fragment, the
+    options used and the identity of dest. None if dest does not exist.
+    '''
+    try:
+        st = os.stat(dest)
+    except OSError:
+        return None
+    return dict(
+        fragments=[[os.path.basename(f), s.st_size, s.st_mtime, s.st_ino] for f, s in fragments],
+        params=params,
+        dest=[st.st_dev, st.st_ino, st.st_size, st.st_mtime],
+    )
+
+
+def read_manifest(path):
+    try:
+        f = open(path)
+        try:
+            manifest = json.load(f)
+        finally:
+            f.close()
+    except (IOError, ValueError):
+        return None
+    if not isinstance(manifest, dict):
+        return None
+    return manifest
+
+
+def write_manifest(path, manifest):
+    ''' Best effort, without a manifest the next run assembles again '''
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        f = os.fdopen(fd, 'w')
+        try:
+            json.dump(manifest, f)
+        finally:
+            f.close()
+        os.rename(tmp, path)
+    except (IOError, OSError):
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+
+
 def cleanup(path, result=None):
     # cleanup just in case
     if os.path.exists(path):
@@ -188,10 +291,11 @@ def main():
             delimiter = dict(required=False),
             dest = dict(required=True),
             backup=dict(default=False, type='bool'),
-            remote_src=dict(default=False, type='bool'),
+            remote_src=dict(default=True, type='bool'),
             regexp = dict(required=False),
             ignore_hidden = dict(default=False, type='bool'),
             validate = dict(required=False, type='str'),
+            manifest = dict(default=False, type='bool'),
         ),
         add_file_common_args=True
     )
@@ -225,7 +329,26 @@ def main():
     if validate and "%s" not in validate:
         module.fail_json(msg="validate must contain %%s: %s" % validate)
 
-    path = assemble_from_fragments(src, delimiter, compiled_regexp, ignore_hidden)
+    if module.params['manifest'] and not module.params['remote_src']:
+        module.fail_json(msg="manifest is only supported with remote_src=yes")
+
+    fragments = fragment_list(src, compiled_regexp, ignore_hidden)
+
+    manifest = None
+    if module.params['manifest']:
+        manifest_params = dict(src=src, delimiter=delimiter, regexp=regexp, ignore_hidden=ignore_hidden)
+        manifest = read_manifest(manifest_path(dest))
+        current = fingerprint(fragments, manifest_params, dest)
+        if manifest and current and not [k for k in current if manifest.get(k) != current[k]]:
+            # nothing changed since dest was assembled
+            result['checksum'] = manifest.get('checksum')
+            result['md5sum'] = manifest.get('md5sum')
+            file_args = module.load_file_common_arguments(module.params)
+            result['changed'] = module.set_fs_attributes_if_different(file_args, False)
+            result['msg'] = "OK"
+            module.exit_json(**result)
+
+    path = assemble_from_fragments(src, delimiter, compiled_regexp, ignore_hidden, fragments)
     path_hash = module.sha1(path)
     result['checksum'] = path_hash
 
@@ -258,6 +381,12 @@ def main():
     file_args = module.load_file_common_arguments(module.params)
     result['changed'] = module.set_fs_attributes_if_different(file_args, changed)
 
+    if module.params['manifest']:
+        manifest = fingerprint(fragments, manifest_params, dest)
+        if manifest is not None:
+            manifest.update(checksum=result['checksum'], md5sum=result['md5sum'])
+            write_manifest(manifest_path(dest), manifest)
+
     # Mission complete
     result['msg'] = "OK"
     module.exit_json(**result)
@@ -89,6 +89,33 @@ options:
     version_added: "1.8"
     description:
       - 'This flag indicates that filesystem links, if they exist, should be followed.'
+  checksum_cache:
+    description:
+      - Path to an on-host cache of file digests. When set, the checksums of C(src) and C(dest) are
+        looked up by the device, inode, size, mtime and ctime of each file and only computed on a cache miss.
+      - The cache file should only be writable by the user running the module.
+      - Only supported with C(remote_src=yes).
+    required: false
+    default: null
+    version_added: "2.3"
+  checksum_cache_size:
+    description:
+      - Maximum number of digests kept in C(checksum_cache), least recently used ones are evicted first.
+      - Only supported with C(remote_src=yes).
+    required: false
+    default: 10000
+    version_added: "2.3"
+  delta:
+    description:
+      - When C(dest) exists and differs, compare it with C(src) block by block and only rewrite the blocks
+        that changed. The update is made to a copy of C(dest) that shares its extents (reflink) where the
+        filesystem supports it, or a plain copy otherwise, and is then moved into place atomically.
+      - Useful for large files with small changes, such as VM images, on slow storage.
+      - Only supported with C(remote_src=yes).
+    required: false
+    default: "no"
+    choices: [ "yes", "no" ]
+    version_added: "2.3"
 extends_documentation_fragment:
     - files
     - validate
@@ -202,18 +229,273 @@ state:
     returned: success
     type: string
     sample: "file"
+delta_blocks_written:
+    description: number of blocks of C(dest) that were rewritten
+    returned: changed and when delta=yes and dest existed
+    type: int
+    sample: 2
+delta_blocks_total:
+    description: number of blocks in the source file
+    returned: changed and when delta=yes and dest existed
+    type: int
+    sample: 16384
+checksum_cache_hits:
+    description: number of digests answered from C(checksum_cache)
+    returned: when checksum_cache is set
+    type: int
+    sample: 3
+checksum_cache_misses:
+    description: number of digests that had to be computed by reading the file
+    returned: when checksum_cache is set
+    type: int
+    sample: 0
 '''
 
 import os
 import shutil
 import tempfile
+import time
 import traceback
 
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 # import module snippets
-from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.basic import AnsibleModule, AVAILABLE_HASH_ALGORITHMS
 from ansible.module_utils.pycompat24 import get_exception
 from ansible.module_utils._text import to_bytes, to_native
 
+# read size used when hashing files
+BUFSIZE = 64 * 1024
+# most bytes handed to copy_file_range/sendfile in one call
+OFFLOAD_CHUNK = 64 * 1024 * 1024
+# granularity of the comparison made in delta mode
+DELTA_BLOCK_SIZE = 64 * 1024
+# ioctl sharing the extents of one file with another (reflink), linux/fs.h
+FICLONE = 0x40049409
+
+
+def digest_file(path, algorithms):
+    '''
+    Read path once, feeding every block to one hash object per algorithm.
+    Returns a dict of hex digests; algorithms this host cannot use (md5 on
+    FIPS systems, for instance) map to None.
+    '''
+    hashes = {}
+    for algorithm in algorithms:
+        try:
+            hashes[algorithm] = AVAILABLE_HASH_ALGORITHMS[algorithm]()
+        except (KeyError, ValueError):
+            pass
+
+    digests = dict([(algorithm, None) for algorithm in algorithms])
+    if hashes:
+        f = open(path, 'rb')
+        try:
+            block = f.read(BUFSIZE)
+            while block:
+                for h in hashes.values():
+                    h.update(block)
+                block = f.read(BUFSIZE)
+        finally:
+            f.close()
+
+        for algorithm, h in hashes.items():
+            digests[algorithm] = h.hexdigest()
+
+    return digests
+
+
+class ChecksumCache(object):
+    '''
+    Persistent on-host digest cache, keyed on the device, inode, size, mtime
+    and ctime of each file so a digest is only reused while the file is
+    untouched. The least recently used entries beyond max_entries are dropped.
+    '''
+
+    # files modified this recently can change again without changing their key
+    RACY_WINDOW = 2
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            f = open(path)
+            try:
+                data = json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            data = None
+        if isinstance(data, dict):
+            # anything but [digest, last use] is a miss
+            for k, entry in data.items():
+                if isinstance(entry, list) and len(entry) == 2 and isinstance(entry[1], (int, float)):
+                    self.entries[k] = entry
+
+    def digests(self, path, algorithms):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return digest_file(path, algorithms)
+
+        stamp = (st.st_dev, st.st_ino, st.st_size, st.st_mtime, st.st_ctime)
+        key = '%d:%d:%d:%r:%r:' % stamp
+        now = time.time()
+        found = {}
+        for algorithm in algorithms:
+            entry = self.entries.get(key + algorithm)
+            if entry is not None:
+                entry[1] = now
+                found[algorithm] = entry[0]
+        missing = [algorithm for algorithm in algorithms if algorithm not in found]
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        if missing:
+            computed = digest_file(path, missing)
+            found.update(computed)
+            try:
+                st = os.stat(path)
+                unchanged = (st.st_dev, st.st_ino, st.st_size, st.st_mtime, st.st_ctime) == stamp
+            except OSError:
+                unchanged = False
+            if unchanged and now - max(stamp[3], stamp[4]) > self.RACY_WINDOW:
+                for algorithm, digest in computed.items():
+                    if digest is not None:
+                        self.entries[key + algorithm] = [digest, now]
+        return found
+
+    def save(self):
+        ''' best effort, failing to persist the cache only costs a rehash next time '''
+        if not self.hits and not self.misses:
+            return
+        lru = sorted(self.entries, key=lambda k: self.entries[k][1])
+        for k in lru[:max(0, len(self.entries) - self.max_entries)]:
+            del self.entries[k]
+
+        cache_dir = os.path.dirname(self.path)
+        tmp = None
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir, int('0700', 8))
+            fd, tmp = tempfile.mkstemp(dir=cache_dir)
+            f = os.fdopen(fd, 'w')
+            try:
+                json.dump(self.entries, f)
+            finally:
+                f.close()
+            os.rename(tmp, self.path)
+        except (IOError, OSError):
+            if tmp is not None and os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def results(self):
+        return dict(checksum_cache_hits=self.hits, checksum_cache_misses=self.misses)
+
+
+def copy_fd(src_fd, dest_fd):
+    '''
+    Copy the contents of one file descriptor to another from their start. The
+    kernel moves the data with copy_file_range or sendfile when python and the
+    platform offer them, a read/write loop takes over wherever they fail.
+    Some files (procfs, sysfs) read as empty through them, a 0 before
+    anything was copied goes to the read/write loop as well.
+    '''
+    copied = 0
+    for name in ('copy_file_range', 'sendfile'):
+        if not hasattr(os, name):
+            continue
+        try:
+            if name == 'sendfile':
+                os.lseek(dest_fd, copied, 0)
+            while True:
+                if name == 'copy_file_range':
+                    n = os.copy_file_range(src_fd, dest_fd, OFFLOAD_CHUNK, copied, copied)
+                else:
+                    n = os.sendfile(dest_fd, src_fd, copied, OFFLOAD_CHUNK)
+                if not n:
+                    break
+                copied += n
+            if copied:
+                return
+            break
+        except OSError:
+            pass
+
+    os.lseek(src_fd, copied, 0)
+    os.lseek(dest_fd, copied, 0)
+    data = os.read(src_fd, BUFSIZE)
+    while data:
+        while data:
+            data = data[os.write(dest_fd, data):]
+        data = os.read(src_fd, BUFSIZE)
+
+
+def copy_file(b_src, b_dest):
+    '''
+    Like shutil.copy2, but clones the extents of b_src (reflink) when the
+    filesystem supports it and otherwise lets the kernel copy the data.
+    '''
+    fsrc = open(b_src, 'rb')
+    try:
+        fdest = open(b_dest, 'wb')
+        try:
+            cloned = False
+            if fcntl is not None:
+                try:
+                    fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+                    cloned = True
+                except (IOError, OSError):
+                    pass
+            if not cloned:
+                copy_fd(fsrc.fileno(), fdest.fileno())
+        finally:
+            fdest.close()
+    finally:
+        fsrc.close()
+    shutil.copystat(b_src, b_dest)
+
+
+def delta_update(b_src, b_dest, block_size=DELTA_BLOCK_SIZE):
+    '''
+    Make b_dest identical to b_src, writing only the blocks that differ.
+    Returns the number of blocks written and the number of blocks in b_src.
+    '''
+    written = 0
+    total = 0
+    fsrc = open(b_src, 'rb')
+    try:
+        fdest = open(b_dest, 'r+b')
+        try:
+            offset = 0
+            block = fsrc.read(block_size)
+            while block:
+                total += 1
+                if fdest.read(len(block)) != block:
+                    fdest.seek(offset)
+                    fdest.write(block)
+                    written += 1
+                offset += len(block)
+                fdest.seek(offset)
+                block = fsrc.read(block_size)
+            fdest.truncate(offset)
+        finally:
+            fdest.close()
+    finally:
+        fsrc.close()
+    return written, total
+
 
 def split_pre_existing_dir(dirname):
     '''
@@ -257,6 +539,9 @@ def main():
             validate          = dict(required=False, type='str'),
             directory_mode    = dict(required=False),
             remote_src        = dict(required=False, type='bool'),
+            checksum_cache    = dict(required=False, type='path'),
+            checksum_cache_size = dict(default=10000, type='int'),
+            delta             = dict(default=False, type='bool'),
         ),
         add_file_common_args=True,
         supports_check_mode=True,
@@ -273,6 +558,11 @@ def main():
     follow = module.params['follow']
     mode = module.params['mode']
     remote_src = module.params['remote_src']
+    delta = module.params['delta']
+
+    # without remote_src an unchanged file is handed to the file module, which does not know these
+    if not remote_src and (delta or module.params['checksum_cache']):
+        module.fail_json(msg="delta and checksum_cache are only supported with remote_src=yes")
 
     if not os.path.exists(b_src):
         module.fail_json(msg="Source %s not found" % (src))
@@ -281,13 +571,19 @@ def main():
     if os.path.isdir(b_src):
         module.fail_json(msg="Remote copy does not support recursive copy of directory: %s" % (src))
 
-    checksum_src = module.sha1(src)
+    cache = None
+    if module.params['checksum_cache']:
+        cache = ChecksumCache(module.params['checksum_cache'], module.params['checksum_cache_size'])
+
+    # sha1 and md5 of the source come from a single read
+    if cache:
+        digests = cache.digests(b_src, ['sha1', 'md5'])
+    else:
+        digests = digest_file(b_src, ['sha1', 'md5'])
+    checksum_src = digests['sha1']
     checksum_dest = None
     # Backwards compat only.  This will be None in FIPS mode
-    try:
-        md5sum_src = module.md5(src)
-    except ValueError:
-        md5sum_src = None
+    md5sum_src = digests['md5']
 
     changed = False
 
@@ -320,9 +616,14 @@ def main():
             b_dest = os.path.realpath(b_dest)
             dest = to_native(b_dest, errors='surrogate_or_strict')
         if not force:
+            if cache:
+                cache.save()
             module.exit_json(msg="file already exists", src=src, dest=dest, changed=False)
         if os.access(b_dest, os.R_OK):
-            checksum_dest = module.sha1(dest)
+            if cache:
+                checksum_dest = cache.digests(b_dest, ['sha1'])['sha1']
+            else:
+                checksum_dest = module.sha1(dest)
     else:
         if not os.path.exists(os.path.dirname(b_dest)):
             try:
@@ -340,6 +641,7 @@ def main():
         module.fail_json(msg="Destination %s not writable" % (os.path.dirname(dest)))
 
     backup_file = None
+    delta_blocks = None
     if checksum_src != checksum_dest or os.path.islink(b_dest):
         if not module.check_mode:
             try:
@@ -362,11 +664,19 @@ def main():
                     if rc != 0:
                         module.fail_json(msg="failed to validate", exit_status=rc, stdout=out, stderr=err)
                 b_mysrc = b_src
-                if remote_src:
-                    _, b_mysrc = tempfile.mkstemp(dir=os.path.dirname(b_dest))
-                    shutil.copy2(b_src, b_mysrc)
+                if delta and os.path.isfile(b_dest):
+                    # patch a clone of dest, only the blocks that differ take new space
+                    fd, b_mysrc = tempfile.mkstemp(dir=os.path.dirname(b_dest))
+                    os.close(fd)
+                    copy_file(b_dest, b_mysrc)
+                    delta_blocks = delta_update(b_src, b_mysrc)
+                    shutil.copystat(b_src, b_mysrc)
+                elif remote_src:
+                    fd, b_mysrc = tempfile.mkstemp(dir=os.path.dirname(b_dest))
+                    os.close(fd)
+                    copy_file(b_src, b_mysrc)
                 module.atomic_move(b_mysrc, dest, unsafe_writes=module.params['unsafe_writes'])
-            except IOError:
+            except (IOError, OSError):
                 module.fail_json(msg="failed to copy: %s to %s" % (src, dest), traceback=traceback.format_exc())
         changed = True
     else:
@@ -377,6 +687,11 @@ def main():
     )
     if backup_file:
         res_args['backup_file'] = backup_file
+    if delta_blocks:
+        res_args['delta_blocks_written'], res_args['delta_blocks_total'] = delta_blocks
+    if cache:
+        cache.save()
+        res_args.update(cache.results())
 
     module.params['dest'] = dest
     if not module.check_mode:
@@ -69,6 +69,9 @@ options:
     version_added: "1.1"
     description:
       - recursively set the specified file attributes (applies only to state=directory)
+      - Since 2.3, when no SELinux context is given and C(mode) is octal, the tree is walked once and
+        C(changed_count) and C(examined_count) report how many of the entries below C(path) were changed
+        and looked at.
   force:
     required: false
     default: "no"
@@ -128,8 +131,11 @@ EXAMPLES = '''
 '''
 
 import errno
+import grp
 import os
+import pwd
 import shutil
+import stat
 import time
 
 # import module snippets
@@ -179,6 +185,148 @@ def recursive_set_attributes(module, b_path, follow, file_args):
     return changed
 
 
+def scandir(b_path):
+    ''' Return (name, lstat) pairs for the entries of a directory '''
+    if hasattr(os, 'scandir'):
+        entries = os.scandir(b_path)
+        try:
+            return [(entry.name, entry.stat(follow_symlinks=False)) for entry in entries]
+        finally:
+            if hasattr(entries, 'close'):
+                entries.close()
+    return [(b_name, os.lstat(os.path.join(b_path, b_name))) for b_name in os.listdir(b_path)]
+
+
+def bulk_set_attributes(module, b_path, follow, file_args):
+    '''
+    Same as recursive_set_attributes(), in one walk of the tree. Owner and group
+    are resolved once and compared with the lstat of each entry, so only the
+    chown/chmod calls that change something are made, relative to an open
+    descriptor of their directory where python supports it. Symlinks still go
+    through set_fs_attributes_if_different().
+    Returns the number of changed and examined entries, or None when file_args
+    need the per path handling (SELinux contexts, symbolic modes).
+    '''
+    if [c for c in file_args['secontext'] if c is not None] or file_args.get('attributes'):
+        return None
+    if module.selinux_enabled() and module.is_special_selinux_path(to_native(b_path, errors='surrogate_or_strict'))[0]:
+        return None
+
+    mode = file_args['mode']
+    if mode is not None and not isinstance(mode, int):
+        try:
+            mode = int(mode, 8)
+        except ValueError:
+            return None
+
+    uid = -1
+    owner = file_args['owner']
+    if owner is not None:
+        try:
+            uid = int(owner)
+        except ValueError:
+            try:
+                uid = pwd.getpwnam(owner).pw_uid
+            except KeyError:
+                module.fail_json(path=file_args['path'], msg='chown failed: failed to look up user %s' % owner)
+
+    gid = -1
+    group = file_args['group']
+    if group is not None:
+        try:
+            gid = int(group)
+        except ValueError:
+            try:
+                gid = grp.getgrnam(group).gr_gid
+            except KeyError:
+                module.fail_json(path=file_args['path'], msg='chgrp failed: failed to look up group %s' % group)
+
+    use_dir_fd = os.chown in getattr(os, 'supports_dir_fd', ()) and os.chmod in os.supports_dir_fd
+
+    changed = 0
+    examined = 0
+    seen = set()
+    stack = [b_path]
+    while stack:
+        b_dir = stack.pop()
+        try:
+            st = os.stat(b_dir)
+            entries = scandir(b_dir)
+        except OSError:
+            # os.walk() skips what it cannot list as well
+            continue
+        if (st.st_dev, st.st_ino) in seen:
+            continue
+        seen.add((st.st_dev, st.st_ino))
+
+        dir_fd = None
+        try:
+            for b_name, st in entries:
+                examined += 1
+                b_fsname = os.path.join(b_dir, b_name)
+
+                if stat.S_ISLNK(st.st_mode):
+                    tmp_file_args = file_args.copy()
+                    tmp_file_args['path'] = to_native(b_fsname, errors='surrogate_or_strict')
+                    if module.set_fs_attributes_if_different(tmp_file_args, False):
+                        changed += 1
+                    if follow:
+                        b_fsname = os.path.join(b_dir, os.readlink(b_fsname))
+                        if os.path.isdir(b_fsname):
+                            stack.append(b_fsname)
+                        tmp_file_args['path'] = to_native(b_fsname, errors='surrogate_or_strict')
+                        if module.set_fs_attributes_if_different(tmp_file_args, False):
+                            changed += 1
+                    continue
+
+                if stat.S_ISDIR(st.st_mode):
+                    stack.append(b_fsname)
+
+                new_uid = -1
+                if uid != -1 and st.st_uid != uid:
+                    new_uid = uid
+                new_gid = -1
+                if gid != -1 and st.st_gid != gid:
+                    new_gid = gid
+                new_mode = mode is not None and stat.S_IMODE(st.st_mode) != mode
+                if new_uid == -1 and new_gid == -1 and not new_mode:
+                    continue
+
+                changed += 1
+                if module.check_mode:
+                    continue
+
+                if use_dir_fd and dir_fd is None:
+                    dir_fd = os.open(b_dir, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+
+                if new_uid != -1 or new_gid != -1:
+                    try:
+                        if dir_fd is None:
+                            os.lchown(b_fsname, new_uid, new_gid)
+                        else:
+                            os.chown(b_name, new_uid, new_gid, dir_fd=dir_fd, follow_symlinks=False)
+                    except OSError:
+                        module.fail_json(path=to_native(b_fsname, errors='surrogate_or_strict'), msg='chown failed')
+                    if mode is not None:
+                        # chown clears setuid/setgid on regular files, the mode is compared again
+                        new_mode = stat.S_IMODE(os.lstat(b_fsname).st_mode) != mode
+
+                if new_mode:
+                    try:
+                        if dir_fd is None:
+                            os.chmod(b_fsname, mode)
+                        else:
+                            os.chmod(b_name, mode, dir_fd=dir_fd)
+                    except OSError:
+                        e = get_exception()
+                        module.fail_json(path=to_native(b_fsname, errors='surrogate_or_strict'), msg='chmod failed', details=str(e))
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+
+    return changed, examined
+
+
 def main():
 
     module = AnsibleModule(
@@ -352,7 +500,13 @@ def main():
         changed = module.set_fs_attributes_if_different(file_args, changed, diff)
 
         if recurse:
-            changed |= recursive_set_attributes(module, to_bytes(file_args['path'], errors='surrogate_or_strict'), follow, file_args)
+            b_recurse_path = to_bytes(file_args['path'], errors='surrogate_or_strict')
+            counts = bulk_set_attributes(module, b_recurse_path, follow, file_args)
+            if counts is None:
+                changed |= recursive_set_attributes(module, b_recurse_path, follow, file_args)
+            else:
+                changed |= counts[0] > 0
+                module.exit_json(path=path, changed=changed, diff=diff, changed_count=counts[0], examined_count=counts[1])
 
         module.exit_json(path=path, changed=changed, diff=diff)
 
@@ -25,6 +25,14 @@ import stat
 import fnmatch
 import time
 import re
+import mmap
+import tempfile
+import threading
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
 
 DOCUMENTATION = '''
 ---
@@ -113,6 +121,54 @@ options:
         choices: [ True, False ]
         description:
             - If false the patterns are file globs (shell) if true they are python regexes
+    excludes:
+        required: false
+        default: null
+        version_added: "2.3"
+        description:
+            - One or more (shell or regex) patterns, which type is controlled by C(use_regex) option.
+            - Items whose basenames match any of these patterns are not returned. Matching
+              directories are pruned, so they are not descended into either.
+        aliases: ['exclude']
+    depth:
+        required: false
+        default: null
+        version_added: "2.3"
+        description:
+            - Set the maximum number of levels to descend into. Setting C(recurse) to false
+              overrides this value, which is effectively depth 1. Default is unlimited depth.
+    max_results:
+        required: false
+        default: null
+        version_added: "2.3"
+        description:
+            - Return at most this many matches. The search stops once one more match than that is found,
+              and C(msg) then says results were limited.
+    workers:
+        required: false
+        default: 1
+        version_added: "2.3"
+        description:
+            - Number of threads used to search file contents (C(contains)) and compute checksums
+              (C(get_checksum)). Candidate files are handed to the pool in batches, so reads of
+              several files overlap.
+            - Files of 1 megabyte or more are searched through mmap, unless the C(contains) pattern
+              could match a newline, and the pattern is then matched at the start of any line of the
+              mapped file instead of line by line.
+    checksum_cache:
+        required: false
+        default: null
+        version_added: "2.3"
+        description:
+            - Path to an on-host cache of file digests used by C(get_checksum). Digests are looked up by
+              the device, inode, size, mtime and ctime of each file and only computed on a cache miss.
+            - The cache file should only be writable by the user running the module.
+    checksum_cache_size:
+        required: false
+        default: 10000
+        version_added: "2.3"
+        description:
+            - Maximum number of digests kept in C(checksum_cache), least recently used ones are evicted first.
 '''
 
 
@@ -149,6 +205,22 @@ EXAMPLES = '''
     patterns: "^.*?\.(?:old|log\.gz)$"
     size: "10m"
     use_regex: True
+
+# find configs mentioning an old hostname, reading up to 8 files at a time
+- find:
+    paths: "/etc,/opt"
+    patterns: "*.conf,*.cfg"
+    contains: ".*oldhost.example.com"
+    recurse: yes
+    workers: 8
+
+# find log files under /var/log, skipping the journal, at most two levels deep
+- find:
+    paths: "/var/log"
+    patterns: "*.log"
+    excludes: "journal"
+    recurse: yes
+    depth: 2
 '''
 
 RETURN = '''
@@ -176,24 +248,46 @@ examined:
     returned: success
     type: string
     sample: 34
+checksum_cache_hits:
+    description: number of checksums answered from C(checksum_cache)
+    returned: when checksum_cache is set
+    type: int
+    sample: 30
+checksum_cache_misses:
+    description: number of checksums that had to be computed by reading the file
+    returned: when checksum_cache is set
+    type: int
+    sample: 4
 '''
 
-def pfilter(f, patterns=None, use_regex=False):
-    '''filter using glob patterns'''
+# files at least this big are searched for C(contains) through mmap
+MMAP_MIN_SIZE = 1024 * 1024
+
+# parts of a C(contains) pattern that may match a newline or anchor differently
+# on a whole file than on one line, such patterns are always matched line by line
+MMAP_UNSAFE = re.compile(r'\\[nrtfvsWDAZx0-9]|\[\^|\(\?[a-zA-Z]*s|\n')
+
+def compile_patterns(patterns, use_regex=False):
+    '''compile shell or regex patterns once, up front'''
 
     if patterns is None:
-        return True
+        return None
 
-    if use_regex:
-        for p in patterns:
-            r =  re.compile(p)
-            if r.match(f):
-                return True
-    else:
+    if not use_regex:
+        patterns = [fnmatch.translate(p) for p in patterns]
 
-        for p in patterns:
-            if fnmatch.fnmatch(f, p):
-                return True
+    return [re.compile(p) for p in patterns]
+
+
+def pfilter(f, patterns=None):
+    '''filter using precompiled patterns'''
+
+    if patterns is None:
+        return True
+
+    for p in patterns:
+        if p.match(f):
+            return True
 
     return False
 
@@ -218,24 +312,287 @@ def sizefilter(st, size):
 
     return False
 
-def contentfilter(fsname, pattern):
-    '''filter files which contain the given expression'''
-    if pattern is None: return True
+def contentfilter(fsname, prog, mprog=None, size=0):
+    '''filter files which contain the given (precompiled) expression'''
+    if prog is None: return True
+
+    if mprog is not None and size >= MMAP_MIN_SIZE:
+        return mmapfilter(fsname, mprog, size)
 
     try:
        f = open(fsname)
-       prog = re.compile(pattern)
        for line in f:
            if prog.match (line):
                f.close()
                return True
 
-       f.close() 
+       f.close()
     except:
        pass
 
     return False
 
+
+def mmapfilter(fsname, mprog, size):
+    '''
+    search a large file through mmap instead of reading it line by line, a
+    match running past the end of its line is checked again on that line only
+    '''
+    lprog = re.compile(mprog.pattern)
+    try:
+        f = open(fsname, 'rb')
+        try:
+            m = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            try:
+                pos = 0
+                while True:
+                    match = mprog.search(m, pos)
+                    if match is None or match.start() == size:
+                        # past the last newline is no line at all
+                        return False
+                    eol = m.find(to_bytes('\n'), match.start())
+                    if eol == -1 or match.end() <= eol + 1:
+                        return True
+                    if lprog.match(m[match.start():eol + 1]):
+                        return True
+                    pos = eol + 1
+            finally:
+                m.close()
+        finally:
+            f.close()
+    except:
+        pass
+
+    return False
+
+
+class ChecksumCache(object):
+    '''
+    Persistent on-host sha1 cache, keyed on the device, inode, size, mtime
+    and ctime of each file so a digest is only reused while the file is
+    untouched. The least recently used entries beyond max_entries are dropped.
+    Lookups may come from several worker threads at once.
+    '''
+
+    # files modified this recently can change again without changing their key
+    RACY_WINDOW = 2
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        try:
+            f = open(path)
+            try:
+                data = json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            data = None
+        if isinstance(data, dict):
+            # anything but [digest, last use] is a miss
+            for k, entry in data.items():
+                if isinstance(entry, list) and len(entry) == 2 and isinstance(entry[1], (int, float)):
+                    self.entries[k] = entry
+
+    def digest(self, path, compute):
+        ''' sha1 of path, compute(path) makes it on a miss '''
+        st = os.stat(path)
+        stamp = (st.st_dev, st.st_ino, st.st_size, st.st_mtime, st.st_ctime)
+        key = '%d:%d:%d:%r:%r:sha1' % stamp
+        now = time.time()
+        self.lock.acquire()
+        try:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                entry[1] = now
+                return entry[0]
+            self.misses += 1
+        finally:
+            self.lock.release()
+
+        digest = compute(path)
+        try:
+            st = os.stat(path)
+            unchanged = (st.st_dev, st.st_ino, st.st_size, st.st_mtime, st.st_ctime) == stamp
+        except OSError:
+            unchanged = False
+        if digest is not None and unchanged and now - max(stamp[3], stamp[4]) > self.RACY_WINDOW:
+            self.lock.acquire()
+            try:
+                self.entries[key] = [digest, now]
+            finally:
+                self.lock.release()
+        return digest
+
+    def save(self):
+        ''' best effort, failing to persist the cache only costs a rehash next time '''
+        if not self.hits and not self.misses:
+            return
+        lru = sorted(self.entries, key=lambda k: self.entries[k][1])
+        for k in lru[:max(0, len(self.entries) - self.max_entries)]:
+            del self.entries[k]
+
+        cache_dir = os.path.dirname(self.path)
+        tmp = None
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir, int('0700', 8))
+            fd, tmp = tempfile.mkstemp(dir=cache_dir)
+            f = os.fdopen(fd, 'w')
+            try:
+                json.dump(self.entries, f)
+            finally:
+                f.close()
+            os.rename(tmp, self.path)
+        except (IOError, OSError):
+            if tmp is not None and os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def results(self):
+        return dict(checksum_cache_hits=self.hits, checksum_cache_misses=self.misses)
+
+
+def inspect_file(module, candidate, contains, mcontains, get_checksum, cache=None):
+    '''content filter and checksum one candidate, returns its result or None if it does not match'''
+    fsname, st = candidate
+
+    if not contentfilter(fsname, contains, mcontains, st.st_size):
+        return None
+
+    r = {'path': fsname}
+    r.update(statinfo(st))
+    # digest_from_file fails the module on unreadable files, which must not happen from a worker thread
+    if get_checksum and os.access(fsname, os.R_OK):
+        try:
+            if cache:
+                r['checksum'] = cache.digest(fsname, module.sha1)
+            else:
+                r['checksum'] = module.sha1(fsname)
+        except (IOError, OSError):
+            pass
+
+    return r
+
+
+def parallel_map(func, items, workers=1):
+    '''
+    apply func to every item using a pool of threads, results keep the order of items.
+    The first exception raised by func in a thread is raised again once all threads are done.
+    '''
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    results = [None] * len(items)
+    pending = list(range(len(items)))
+    pending.reverse()
+    errors = []
+
+    def worker():
+        while not errors:
+            try:
+                idx = pending.pop()
+            except IndexError:
+                return
+            try:
+                results[idx] = func(items[idx])
+            except Exception:
+                errors.append(get_exception())
+
+    threads = []
+    for i in range(min(workers, len(items))):
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+        threads.append(t)
+
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise errors[0]
+    return results
+
+
+def inspect_files(module, candidates, contains, mcontains, get_checksum, workers=1, cache=None):
+    '''run the content and checksum phase over a batch of candidates'''
+    results = parallel_map(lambda c: inspect_file(module, c, contains, mcontains, get_checksum, cache), candidates, workers)
+    return [r for r in results if r is not None]
+
+
+class FsEntry(object):
+    '''minimal os.DirEntry work-alike for pythons without os.scandir'''
+
+    def __init__(self, root, name):
+        self.name = name
+        self.path = os.path.join(root, name)
+        self._lstat = None
+
+    def stat(self, follow_symlinks=True):
+        if follow_symlinks:
+            return os.stat(self.path)
+        if self._lstat is None:
+            self._lstat = os.lstat(self.path)
+        return self._lstat
+
+    def is_dir(self, follow_symlinks=True):
+        try:
+            return stat.S_ISDIR(self.stat(follow_symlinks=follow_symlinks).st_mode)
+        except OSError:
+            return False
+
+
+def scandir(path):
+    '''iterate over directory entries, using os.scandir's cached file types when available'''
+    if hasattr(os, 'scandir'):
+        # listed up front so the directory is closed even if the walk stops early
+        entries = os.scandir(path)
+        try:
+            return list(entries)
+        finally:
+            if hasattr(entries, 'close'):
+                entries.close()
+    return [FsEntry(path, name) for name in os.listdir(path)]
+
+
+def walk(top, follow=False, depth=None, excludes=None):
+    '''
+    Generator yielding directory entries below top, top down and depth first.
+    Only the pending subdirectories are kept in memory, never the whole tree.
+    Entries matching excludes are skipped and, if directories, not descended into.
+    '''
+    stack = [(top, 1)]
+    while stack:
+        root, level = stack.pop()
+        subdirs = []
+        try:
+            entries = scandir(root)
+        except OSError:
+            # same as os.walk, unreadable directories are silently skipped
+            continue
+
+        for entry in entries:
+            if excludes is not None and pfilter(entry.name, excludes):
+                continue
+
+            yield entry
+
+            if depth is None or level < depth:
+                try:
+                    if entry.is_dir(follow_symlinks=follow):
+                        subdirs.append(entry.path)
+                except OSError:
+                    pass
+
+        subdirs.reverse()
+        for subdir in subdirs:
+            stack.append((subdir, level + 1))
+
+
 def statinfo(st):
     return {
         'mode'     : "%04o" % stat.S_IMODE(st.st_mode),
@@ -284,6 +641,12 @@ def main():
             follow        = dict(default="False", type='bool'),
             get_checksum  = dict(default="False", type='bool'),
             use_regex     = dict(default="False", type='bool'),
+            excludes      = dict(default=None, type='list', aliases=['exclude']),
+            depth         = dict(default=None, type='int'),
+            max_results   = dict(default=None, type='int'),
+            workers       = dict(default=1, type='int'),
+            checksum_cache = dict(default=None, type='path'),
+            checksum_cache_size = dict(default=10000, type='int'),
         ),
         supports_check_mode=True,
     )
@@ -314,60 +677,108 @@ def main():
         else:
             module.fail_json(size=params['size'], msg="failed to process size")
 
+    if params['recurse']:
+        depth = params['depth']
+    else:
+        depth = 1
+
+    patterns = compile_patterns(params['patterns'], params['use_regex'])
+    excludes = compile_patterns(params['excludes'], params['use_regex'])
+    if params['contains'] is None:
+        contains = None
+        mcontains = None
+    else:
+        contains = re.compile(params['contains'])
+        mcontains = None
+        if not MMAP_UNSAFE.search(params['contains']):
+            mcontains = re.compile(to_bytes('^(?:%s)' % params['contains']), re.MULTILINE)
+
+    max_results = params['max_results']
+
+    # candidates waiting for the content/checksum phase, handed to the workers in batches
+    workers = params['workers']
+    pending = []
+    if workers > 1:
+        batch_size = workers * 32
+    else:
+        batch_size = 1
+
+    cache = None
+    if params['checksum_cache'] and params['get_checksum']:
+        cache = ChecksumCache(params['checksum_cache'], params['checksum_cache_size'])
+
     now = time.time()
     msg = ''
     looked = 0
+    # one match more than max_results is looked for, to tell whether any was left out
     for npath in params['paths']:
+        if max_results is not None and len(filelist) > max_results:
+            break
+
         if os.path.isdir(npath):
 
-            ''' ignore followlinks for python version < 2.6 '''
-            for root,dirs,files in (sys.version_info < (2,6,0) and os.walk(npath)) or \
-                                    os.walk( npath, followlinks=params['follow']):
-                looked = looked + len(files) + len(dirs)
-                for fsobj in (files + dirs):
-                    fsname=os.path.normpath(os.path.join(root, fsobj))
-
-                    if os.path.basename(fsname).startswith('.') and not params['hidden']:
-                       continue
-
-                    try:
-                        st = os.lstat(fsname)
-                    except:
-                        msg+="%s was skipped as it does not seem to be a valid file or it cannot be accessed\n" % fsname
-                        continue
-
-                    r = {'path': fsname}
-                    if stat.S_ISDIR(st.st_mode) and params['file_type'] == 'directory':
-                        if pfilter(fsobj, params['patterns'], params['use_regex']) and agefilter(st, now, age, params['age_stamp']):
-
-                            r.update(statinfo(st))
-                            filelist.append(r)
-
-                    elif stat.S_ISREG(st.st_mode) and params['file_type'] == 'file':
-                        if pfilter(fsobj, params['patterns'], params['use_regex']) and \
-                           agefilter(st, now, age, params['age_stamp']) and \
-                           sizefilter(st, size) and \
-                           contentfilter(fsname, params['contains']):
-
-                            r.update(statinfo(st))
-                            if params['get_checksum']:
-                                r['checksum'] = module.sha1(fsname)
-                            filelist.append(r)
-
-                    elif stat.S_ISLNK(st.st_mode) and params['file_type'] == 'link':
-                        if pfilter(fsobj, params['patterns'], params['use_regex']) and agefilter(st, now, age, params['age_stamp']):
-                            r.update(statinfo(st))
-                            filelist.append(r)
-
-                if not params['recurse']:
+            for entry in walk(os.path.normpath(npath), params['follow'], depth, excludes):
+                looked = looked + 1
+
+                if entry.name.startswith('.') and not params['hidden']:
+                    continue
+
+                # cheap name check first, only stat what can still match
+                if not pfilter(entry.name, patterns):
+                    continue
+
+                fsname = entry.path
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except:
+                    msg+="%s was skipped as it does not seem to be a valid file or it cannot be accessed\n" % fsname
+                    continue
+
+                r = {'path': fsname}
+                if stat.S_ISDIR(st.st_mode) and params['file_type'] == 'directory':
+                    if agefilter(st, now, age, params['age_stamp']):
+
+                        r.update(statinfo(st))
+                        filelist.append(r)
+
+                elif stat.S_ISREG(st.st_mode) and params['file_type'] == 'file':
+                    if agefilter(st, now, age, params['age_stamp']) and \
+                       sizefilter(st, size):
+
+                        pending.append((fsname, st))
+                        if len(pending) >= batch_size:
+                            filelist.extend(inspect_files(module, pending, contains, mcontains, params['get_checksum'], workers, cache))
+                            pending = []
+
+                elif stat.S_ISLNK(st.st_mode) and params['file_type'] == 'link':
+                    if agefilter(st, now, age, params['age_stamp']):
+                        r.update(statinfo(st))
+                        filelist.append(r)
+
+                if max_results is not None and len(filelist) > max_results:
                     break
+
+            if pending:
+                filelist.extend(inspect_files(module, pending, contains, mcontains, params['get_checksum'], workers, cache))
+                pending = []
         else:
             msg+="%s was skipped as it does not seem to be a valid directory or it cannot be accessed\n" % npath
 
+    if max_results is not None and len(filelist) > max_results:
+        filelist = filelist[:max_results]
+        msg+="results were limited to max_results (%d)\n" % max_results
+
     matched = len(filelist)
-    module.exit_json(files=filelist, changed=False, msg=msg, matched=matched, examined=looked)
+    results = dict(files=filelist, changed=False, msg=msg, matched=matched, examined=looked)
+    if cache:
+        cache.save()
+        results.update(cache.results())
+
+    module.exit_json(**results)
 
 # import module snippets
 from ansible.module_utils.basic import *
+from ansible.module_utils._text import to_bytes
+from ansible.module_utils.pycompat24 import get_exception
 main()
 
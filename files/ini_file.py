@@ -41,7 +41,8 @@ options:
     description:
       - Section name in INI file. This is added if C(state=present) automatically when
         a single value is being set.
-    required: true
+      - Required unless C(settings) is given.
+    required: false
     default: null
   option:
     description:
@@ -85,6 +86,17 @@ options:
        - If set to 'no', the module will fail if the file does not already exist.
          By default it will create the file if it is missing.
      version_added: "2.2"
+  settings:
+     description:
+       - A dict of sections, each a dict of options and their values, to apply in one pass
+         instead of C(section), C(option) and C(value).
+       - The file is parsed once into its sections, keeping comments and ordering, and written
+         at most once. The result is the same as one task per option.
+       - With C(state=absent) the listed options are removed, and a section given without
+         options is removed entirely.
+     required: false
+     default: null
+     version_added: "2.3"
 notes:
    - While it is possible to add an I(option) without specifying a I(value), this makes
      no sense.
@@ -109,6 +121,16 @@ EXAMPLES = '''
     option: temperature
     value: cold
     backup: yes
+
+# Set many options at once, with a single read and write of the file
+- ini_file:
+    dest: /etc/php.ini
+    settings:
+      PHP:
+        memory_limit: 256M
+        expose_php: 'Off'
+      Date:
+        date.timezone: UTC
 '''
 
 import os
@@ -130,6 +152,171 @@ def match_active_opt(option, line):
   option = re.escape(option)
   return re.match(' *%s( |\t)*=' % option, line)
 
+# ==============================================================
+# IniIndex
+
+class IniIndex(object):
+    '''
+    The lines of an INI file split up in sections, with an index of the
+    sections by name. Comments, blank lines and ordering are kept as they are,
+    lines before the first section header belong to a section named None.
+    '''
+
+    def __init__(self, ini_lines):
+        self.sections = [dict(name=None, lines=[])]
+        self.index = {}
+        for line in ini_lines:
+            if line.startswith('['):
+                name = None
+                if ']' in line:
+                    name = line[1:line.index(']')]
+                self.add_section(name, line)
+            else:
+                self.sections[-1]['lines'].append(line)
+
+    def add_section(self, name, header):
+        section = dict(name=name, lines=[header])
+        self.sections.append(section)
+        if name is not None:
+            self.index.setdefault(name, []).append(section)
+        return section
+
+    def get(self, name):
+        ''' First section of that name, like do_ini() uses '''
+        found = self.index.get(name)
+        if found:
+            return found[0]
+        return None
+
+    def remove(self, section):
+        self.sections.remove(section)
+        self.index[section['name']].remove(section)
+
+    def lines(self):
+        ini_lines = []
+        for section in self.sections:
+            ini_lines.extend(section['lines'])
+        return ini_lines
+
+# ==============================================================
+# set_option / remove_option
+
+def set_option(section, option, value, assignment_format):
+  ''' Same as do_ini() with state=present on the lines of a section, returns what was done '''
+  lines = section['lines']
+  option_re = re.compile('( *|# *|; *)%s( |\t)*=' % re.escape(option))
+  active_re = re.compile(' *%s( |\t)*=' % re.escape(option))
+  newline = assignment_format % (option, value)
+  for index in range(1, len(lines)):
+    if option_re.match(lines[index]):
+      if lines[index] == newline:
+        return None
+      lines[index] = newline
+      # remove all possible option occurrences from the rest of the section
+      lines[index + 1:] = [l for l in lines[index + 1:] if not active_re.match(l)]
+      return 'changed'
+
+  # insert missing option line at the end of the section
+  for index in range(len(lines), 0, -1):
+    if not re.match(r'^[ \t]*([#;].*)?$', lines[index - 1]):
+      lines.insert(index, newline)
+      return 'added'
+
+def remove_option(section, option):
+  ''' Same as do_ini() with state=absent, the first active occurrence is removed '''
+  lines = section['lines']
+  active_re = re.compile(' *%s( |\t)*=' % re.escape(option))
+  for index in range(1, len(lines)):
+    if active_re.match(lines[index]):
+      del lines[index]
+      return 'removed'
+  return None
+
+# ==============================================================
+# do_ini_settings
+
+def do_ini_settings(module, filename, settings, state='present', backup=False,
+        no_extra_spaces=False, create=False):
+
+    diff = {'before': '',
+            'after': '',
+            'before_header': '%s (content)' % filename,
+            'after_header': '%s (content)' % filename}
+
+    if not os.path.exists(filename):
+        if not create:
+            module.fail_json(rc=257, msg='Destination %s does not exist !' % filename)
+        destpath = os.path.dirname(filename)
+        if not os.path.exists(destpath) and not module.check_mode:
+            os.makedirs(destpath)
+        ini_lines = []
+    else:
+        ini_file = open(filename, 'r')
+        try:
+            ini_lines = ini_file.readlines()
+        finally:
+            ini_file.close()
+
+    if module._diff:
+        diff['before'] = ''.join(ini_lines)
+
+    if no_extra_spaces:
+        assignment_format = '%s=%s\n'
+    else:
+        assignment_format = '%s = %s\n'
+
+    ini = IniIndex(ini_lines)
+    counts = {'added': 0, 'changed': 0, 'removed': 0, 'sections removed': 0}
+    for section_name, options in settings.items():
+        if options is not None and not isinstance(options, dict):
+            module.fail_json(msg='settings for section %s must be a dict of options' % section_name)
+        section = ini.get(section_name)
+
+        if state == 'absent':
+            if section is None:
+                continue
+            if not options:
+                ini.remove(section)
+                counts['sections removed'] += 1
+                continue
+            for option in options:
+                done = remove_option(section, option)
+                if done:
+                    counts[done] += 1
+            continue
+
+        for option, value in (options or {}).items():
+            if section is None:
+                section = ini.add_section(section_name, '[%s]\n' % section_name)
+            done = set_option(section, option, value, assignment_format)
+            if done:
+                counts[done] += 1
+
+    msgs = []
+    for what in ('added', 'changed', 'removed'):
+        if counts[what]:
+            msgs.append('%d option(s) %s' % (counts[what], what))
+    if counts['sections removed']:
+        msgs.append('%d section(s) removed' % counts['sections removed'])
+    changed = len(msgs) > 0
+    msg = ', '.join(msgs) or 'OK'
+
+    ini_lines = ini.lines()
+    if module._diff:
+        diff['after'] = ''.join(ini_lines)
+
+    backup_file = None
+    if changed and not module.check_mode:
+        if backup:
+            backup_file = module.backup_local(filename)
+        ini_file = open(filename, 'w')
+        try:
+            ini_file.writelines(ini_lines)
+        finally:
+            ini_file.close()
+
+    return (changed, backup_file, diff, msg)
+
 # ==============================================================
 # do_ini
 
@@ -253,14 +440,17 @@ def main():
     module = AnsibleModule(
         argument_spec = dict(
             dest = dict(required=True),
-            section = dict(required=True),
+            section = dict(required=False),
             option = dict(required=False),
             value = dict(required=False),
             backup = dict(default='no', type='bool'),
             state = dict(default='present', choices=['present', 'absent']),
             no_extra_spaces = dict(required=False, default=False, type='bool'),
-            create=dict(default=True, type='bool')
+            create=dict(default=True, type='bool'),
+            settings = dict(required=False, type='dict'),
         ),
+        required_one_of = [['section', 'settings']],
+        mutually_exclusive = [['settings', 'section'], ['settings', 'option'], ['settings', 'value']],
         add_file_common_args = True,
         supports_check_mode = True
     )
@@ -274,7 +464,12 @@ def main():
     no_extra_spaces = module.params['no_extra_spaces']
     create = module.params['create']
 
-    (changed,backup_file,diff,msg) = do_ini(module, dest, section, option, value, state, backup, no_extra_spaces, create)
+    settings = module.params['settings']
+
+    if settings is not None:
+        (changed,backup_file,diff,msg) = do_ini_settings(module, dest, settings, state, backup, no_extra_spaces, create)
+    else:
+        (changed,backup_file,diff,msg) = do_ini(module, dest, section, option, value, state, backup, no_extra_spaces, create)
 
     if not module.check_mode and os.path.exists(dest):
         file_args = module.load_file_common_arguments(module.params)
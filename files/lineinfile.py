@@ -113,6 +113,16 @@ options:
      description:
        - Create a backup file including the timestamp information so you can
          get the original file back if you somehow clobbered it incorrectly.
+  rules:
+     required: false
+     version_added: "2.3"
+     description:
+       - A list of rules applied in order to the file in one pass, each a dict with the keys C(regexp),
+         C(line), C(state), C(insertafter), C(insertbefore) and C(backrefs), which have the same meaning
+         and defaults as the options of the same name.
+       - The result is the same as running one task per rule, but the file is read and matched against
+         all the regular expressions once, and written at most once with a single diff.
+       - Cannot be used with C(regexp), C(line), C(insertafter), C(insertbefore) or C(backrefs).
   others:
      description:
        - All arguments accepted by the M(file) module also work here.
@@ -168,6 +178,18 @@ EXAMPLES = r"""
     line: '\1Xms${xms}m\3'
     backrefs: yes
 
+# Apply several edits with a single read and write of the file
+- lineinfile:
+    dest: /etc/ssh/sshd_config
+    validate: '/usr/sbin/sshd -t -f %s'
+    rules:
+      - regexp: '^PermitRootLogin '
+        line: 'PermitRootLogin no'
+      - regexp: '^PasswordAuthentication '
+        line: 'PasswordAuthentication no'
+      - regexp: '^#?UseDNS '
+        state: absent
+
 # Validate the sudoers file before saving
 - lineinfile:
     dest: /etc/sudoers
@@ -183,6 +205,7 @@ import tempfile
 
 # import module snippets
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.pycompat24 import get_exception
 from ansible.module_utils.six import b
 from ansible.module_utils._text import to_bytes, to_native
 
@@ -404,6 +427,197 @@ def absent(module, dest, regexp, line, backup):
     module.exit_json(changed=changed, found=len(found), msg=msg, backup=backupdest, diff=difflist)
 
 
+RULE_KEYS = ('regexp', 'line', 'state', 'insertafter', 'insertbefore', 'backrefs')
+
+
+def compile_rules(module, rules):
+    '''
+    Validate rules the way main() validates the options, and return a list of
+    (rule, main test, insert test) where the tests are callables matching a
+    line of the file.
+    '''
+    compiled = []
+    for rule in rules:
+        if not isinstance(rule, dict):
+            module.fail_json(msg='rules must be a list of dicts, got %s' % rule)
+        unknown = [k for k in rule if k not in RULE_KEYS]
+        if unknown:
+            module.fail_json(msg='unsupported keys in rule %s: %s' % (rule, ', '.join(unknown)))
+
+        rule = dict(rule)
+        rule.setdefault('state', 'present')
+        rule['backrefs'] = module.boolean(rule.get('backrefs', False))
+        regexp = rule.get('regexp')
+        line = rule.get('line')
+        if rule['state'] not in ('present', 'absent'):
+            module.fail_json(msg='state must be present or absent in rule %s' % rule)
+
+        if rule['state'] == 'present':
+            if rule['backrefs'] and regexp is None:
+                module.fail_json(msg='regexp= is required with backrefs=true in rule %s' % rule)
+            if line is None:
+                module.fail_json(msg='line= is required with state=present in rule %s' % rule)
+            if rule.get('insertbefore') is not None and rule.get('insertafter') is not None:
+                module.fail_json(msg='insertbefore and insertafter are mutually exclusive in rule %s' % rule)
+            if rule.get('insertbefore') is None and rule.get('insertafter') is None:
+                rule['insertafter'] = 'EOF'
+        elif regexp is None and line is None:
+            module.fail_json(msg='one of line= or regexp= is required with state=absent in rule %s' % rule)
+
+        if regexp is not None:
+            try:
+                test = re.compile(to_bytes(regexp, errors='surrogate_or_strict')).search
+            except re.error:
+                e = get_exception()
+                module.fail_json(msg='invalid regexp %s: %s' % (regexp, e))
+        else:
+            b_rule_line = to_bytes(line, errors='surrogate_or_strict')
+            test = lambda b_cur_line, b_rule_line=b_rule_line: b_rule_line == b_cur_line.rstrip(b('\r\n'))
+
+        ins_test = None
+        insert = rule.get('insertafter')
+        if insert in (None, 'BOF', 'EOF'):
+            insert = rule.get('insertbefore')
+        if rule['state'] == 'present' and insert not in (None, 'BOF', 'EOF'):
+            ins_test = re.compile(to_bytes(insert, errors='surrogate_or_strict')).search
+
+        compiled.append((rule, test, ins_test))
+    return compiled
+
+
+def match_line(compiled, b_cur_line):
+    ''' Return the set of rule tests matching a line, 2n for rule n, 2n+1 for its insert pattern '''
+    hits = set()
+    for n, (rule, test, ins_test) in enumerate(compiled):
+        if test(b_cur_line):
+            hits.add(2 * n)
+        if ins_test is not None and ins_test(b_cur_line):
+            hits.add(2 * n + 1)
+    return hits
+
+
+def apply_rules(module, dest, rules, create, backup):
+    '''
+    Apply every rule to the file, with the semantics of present() and absent()
+    run one after the other. Each line is matched against all the rules once;
+    only lines replaced or added by a rule are matched again.
+    '''
+    compiled = compile_rules(module, rules)
+
+    diff = {'before': '',
+            'after': '',
+            'before_header': '%s (content)' % dest,
+            'after_header': '%s (content)' % dest}
+
+    b_dest = to_bytes(dest, errors='surrogate_or_strict')
+    if not os.path.exists(b_dest):
+        if not [r for r, t, i in compiled if r['state'] == 'present']:
+            module.exit_json(changed=False, msg="file not present")
+        if not create:
+            module.fail_json(rc=257, msg='Destination %s does not exist !' % dest)
+        b_destpath = os.path.dirname(b_dest)
+        if not os.path.exists(b_destpath) and not module.check_mode:
+            os.makedirs(b_destpath)
+        b_lines = []
+    else:
+        f = open(b_dest, 'rb')
+        b_lines = f.readlines()
+        f.close()
+
+    if module._diff:
+        diff['before'] = to_native(b('').join(b_lines))
+
+    hits = [match_line(compiled, b_cur_line) for b_cur_line in b_lines]
+
+    b_linesep = to_bytes(os.linesep, errors='surrogate_or_strict')
+    replaced = added = removed = 0
+    for n, (rule, test, ins_test) in enumerate(compiled):
+        if rule['state'] == 'absent':
+            kept = [i for i in range(len(b_lines)) if 2 * n not in hits[i]]
+            removed += len(b_lines) - len(kept)
+            b_lines = [b_lines[i] for i in kept]
+            hits = [hits[i] for i in kept]
+            continue
+
+        insertafter = rule.get('insertafter')
+        insertbefore = rule.get('insertbefore')
+
+        # index[0] is the line num where regexp has been found
+        # index[1] is the line num where insertafter/inserbefore has been found
+        index = [-1, -1]
+        for lineno, line_hits in enumerate(hits):
+            if 2 * n in line_hits:
+                index[0] = lineno
+            elif 2 * n + 1 in line_hits:
+                if insertafter:
+                    index[1] = lineno + 1
+                if insertbefore:
+                    index[1] = lineno
+
+        b_line = to_bytes(rule['line'], errors='surrogate_or_strict')
+        if index[0] != -1:
+            if rule['backrefs']:
+                b_new_line = test(b_lines[index[0]]).expand(b_line)
+            else:
+                b_new_line = b_line
+
+            if not b_new_line.endswith(b_linesep):
+                b_new_line += b_linesep
+
+            if b_lines[index[0]] != b_new_line:
+                b_lines[index[0]] = b_new_line
+                hits[index[0]] = match_line(compiled, b_new_line)
+                replaced += 1
+            continue
+        elif rule['backrefs']:
+            continue
+        elif insertbefore == 'BOF' or insertafter == 'BOF':
+            position = 0
+        elif insertafter == 'EOF' or index[1] == -1:
+            if len(b_lines) > 0 and not b_lines[-1][-1:] in (b('\n'), b('\r')):
+                b_lines.append(b_linesep)
+                hits.append(match_line(compiled, b_linesep))
+            position = len(b_lines)
+        else:
+            position = index[1]
+
+        b_lines.insert(position, b_line + b_linesep)
+        hits.insert(position, match_line(compiled, b_line + b_linesep))
+        added += 1
+
+    msgs = []
+    if replaced:
+        msgs.append('%d line(s) replaced' % replaced)
+    if added:
+        msgs.append('%d line(s) added' % added)
+    if removed:
+        msgs.append('%d line(s) removed' % removed)
+    msg = ', '.join(msgs)
+    changed = len(msgs) > 0
+
+    if module._diff:
+        diff['after'] = to_native(b('').join(b_lines))
+
+    backupdest = ""
+    if changed and not module.check_mode:
+        if backup and os.path.exists(b_dest):
+            backupdest = module.backup_local(dest)
+        write_changes(module, b_lines, dest)
+
+    if module.check_mode and not os.path.exists(b_dest):
+        module.exit_json(changed=changed, msg=msg, backup=backupdest, diff=diff)
+
+    attr_diff = {}
+    msg, changed = check_file_attrs(module, changed, msg, attr_diff)
+
+    attr_diff['before_header'] = '%s (file attributes)' % dest
+    attr_diff['after_header'] = '%s (file attributes)' % dest
+
+    difflist = [diff, attr_diff]
+    module.exit_json(changed=changed, msg=msg, backup=backupdest, diff=difflist,
+                     replaced=replaced, added=added, found=removed)
+
+
 def main():
     module = AnsibleModule(
         argument_spec=dict(
@@ -417,8 +631,11 @@ def main():
             create=dict(default=False, type='bool'),
             backup=dict(default=False, type='bool'),
             validate=dict(default=None, type='str'),
+            rules=dict(default=None, type='list'),
         ),
-        mutually_exclusive=[['insertbefore', 'insertafter']],
+        mutually_exclusive=[['insertbefore', 'insertafter'],
+                            ['rules', 'regexp'], ['rules', 'line'], ['rules', 'insertafter'],
+                            ['rules', 'insertbefore'], ['rules', 'backrefs']],
         add_file_common_args=True,
         supports_check_mode=True
     )
@@ -433,6 +650,9 @@ def main():
     if os.path.isdir(b_dest):
         module.fail_json(rc=256, msg='Destination %s is a directory !' % dest)
 
+    if params['rules'] is not None:
+        apply_rules(module, dest, params['rules'], create, backup)
+
     if params['state'] == 'present':
         if backrefs and params['regexp'] is None:
             module.fail_json(msg='regexp= is required with backrefs=true')
@@ -74,6 +74,28 @@ options:
     version_added: "1.9"
     description:
       - 'This flag indicates that filesystem links, if they exist, should be followed.'
+  stream:
+    required: false
+    default: "no"
+    choices: [ "yes", "no" ]
+    version_added: "2.3"
+    description:
+      - Read the file in overlapping windows and write the result to a temporary file next to it,
+        instead of loading the whole file in memory. Meant for large files such as logs or SQL dumps.
+      - Matches must not be longer than C(max_match_span). If one is, the task fails without
+        changing the file.
+      - The file is read 1 megabyte or twice C(max_match_span) at a time, whichever is larger.
+        A match longer than C(max_match_span) is only detected if it fits in one read. Otherwise
+        it is treated as no match at all.
+      - Anything the regexp looks at around a match, such as a lookbehind or a lookahead, must
+        also fit within C(max_match_span).
+      - No diff is returned in this mode.
+  max_match_span:
+    required: false
+    default: 65536
+    version_added: "2.3"
+    description:
+      - Used with C(stream=yes). The maximum length, in bytes, of a match.
 """
 
 EXAMPLES = r"""
@@ -95,8 +117,18 @@ EXAMPLES = r"""
     regexp: '^(NameVirtualHost|Listen)\s+80\s*$'
     replace: '\1 127.0.0.1:8080'
     validate: '/usr/sbin/apache2ctl -f %s -t'
+
+- replace:
+    dest: /var/backups/dump.sql
+    regexp: 'DEFINER=`[^`]*`@`[^`]*`'
+    replace: ''
+    stream: yes
+    max_match_span: 512
 """
 
+# bytes read at a time in stream mode
+CHUNK_SIZE = 1024 * 1024
+
 def write_changes(module,contents,dest):
 
     tmpfd, tmpfile = tempfile.mkstemp()
@@ -104,6 +136,10 @@ def write_changes(module,contents,dest):
     f.write(contents)
     f.close()
 
+    move_changes(module, tmpfile, dest)
+
+def move_changes(module, tmpfile, dest):
+
     validate = module.params.get('validate', None)
     valid = not validate
     if validate:
@@ -117,6 +153,90 @@ def write_changes(module,contents,dest):
     if valid:
         module.atomic_move(tmpfile, dest, unsafe_writes=module.params['unsafe_writes'])
 
+def stream_replace(module, mre, replace, dest, span):
+    '''
+    Replace all matches of mre in dest, into a temporary file in the same
+    directory. The file is read in chunks, a match has to start at least
+    slack bytes before the end of what was read to be replaced, later ones are
+    looked for again once more is read. Up to span bytes before the current
+    position are kept as well for anchors and lookbehinds.
+    A match longer than span fails the module instead of being replaced. Any
+    match up to slack bytes long fits in the buffer, so it is found where it
+    starts rather than cut short or passed over for a later one.
+    Returns the temporary file, the number of replacements and whether the
+    contents changed.
+    '''
+    tmpfd, tmpfile = tempfile.mkstemp(dir=os.path.dirname(os.path.realpath(dest)))
+    out = os.fdopen(tmpfd, 'wb')
+    count = 0
+    differs = False
+    # offset in dest of the start of buf, and of a match too long to replace
+    offset = 0
+    too_long = None
+    slack = max(2 * span, CHUNK_SIZE)
+    try:
+        f = open(dest, 'rb')
+        try:
+            buf = f.read(max(CHUNK_SIZE, span))
+            pos = 0
+            eof = False
+            while True:
+                data = f.read(max(CHUNK_SIZE, span))
+                if data:
+                    buf = buf + data
+                else:
+                    eof = True
+
+                if eof:
+                    limit = len(buf)
+                else:
+                    limit = len(buf) - slack
+
+                while pos <= limit:
+                    m = mre.search(buf, pos)
+                    if m is None or (m.start() >= limit and not eof):
+                        break
+                    if m.end() - m.start() > span or (not eof and m.end() >= len(buf)):
+                        too_long = offset + m.start()
+                        break
+                    new = m.expand(replace)
+                    out.write(buf[pos:m.start()])
+                    out.write(new)
+                    count += 1
+                    if new != m.group(0):
+                        differs = True
+                    pos = m.end()
+                    if m.start() == m.end():
+                        # step over empty matches, like re.subn
+                        out.write(buf[pos:pos + 1])
+                        pos += 1
+
+                if too_long is not None:
+                    break
+
+                if eof:
+                    out.write(buf[pos:])
+                    break
+
+                # keep what may still be part of a match, and some context before it
+                cut = max(pos, limit)
+                out.write(buf[pos:cut])
+                keep = max(0, cut - span)
+                buf = buf[keep:]
+                pos = cut - keep
+                offset += keep
+        finally:
+            f.close()
+    finally:
+        out.close()
+
+    if too_long is not None:
+        os.unlink(tmpfile)
+        module.fail_json(msg='The match at byte %d of %s is longer than max_match_span (%d bytes), '
+                             'raise max_match_span' % (too_long, dest, span))
+
+    return tmpfile, count, differs
+
 def check_file_attrs(module, changed, message):
 
     file_args = module.load_file_common_arguments(module.params)
@@ -137,6 +257,8 @@ def main():
             replace=dict(default='', type='str'),
             backup=dict(default=False, type='bool'),
             validate=dict(default=None, type='str'),
+            stream=dict(default=False, type='bool'),
+            max_match_span=dict(default=65536, type='int'),
         ),
         add_file_common_args=True,
         supports_check_mode=True
@@ -151,6 +273,25 @@ def main():
 
     if not os.path.exists(dest):
         module.fail_json(rc=257, msg='Destination %s does not exist !' % dest)
+    elif params['stream']:
+        if params['max_match_span'] < 1:
+            module.fail_json(msg='max_match_span must be a positive number of bytes')
+        mre = re.compile(to_bytes(params['regexp'], errors='surrogate_or_strict'), re.MULTILINE)
+        replace = to_bytes(params['replace'], errors='surrogate_or_strict')
+        tmpfile, count, changed = stream_replace(module, mre, replace, dest, params['max_match_span'])
+        msg = ''
+        if changed:
+            msg = '%s replacements made' % count
+        if changed and not module.check_mode:
+            if params['backup']:
+                res_args['backup_file'] = module.backup_local(dest)
+            if params['follow'] and os.path.islink(dest):
+                dest = os.path.realpath(dest)
+            move_changes(module, tmpfile, dest)
+        else:
+            os.unlink(tmpfile)
+        res_args['msg'], res_args['changed'] = check_file_attrs(module, changed, msg)
+        module.exit_json(**res_args)
     else:
         f = open(dest, 'rb')
         contents = f.read()
@@ -185,6 +326,7 @@ def main():
 
 # this is magic, see lib/ansible/module_common.py
 from ansible.module_utils.basic import *
+from ansible.module_utils._text import to_bytes
 
 if __name__ == '__main__':
     main()
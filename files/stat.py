@@ -25,8 +25,19 @@ options:
   path:
     description:
       - The full path of the file/object to get the facts of
-    required: true
+      - Either C(path) or C(paths) is required.
+    required: false
     default: null
+  paths:
+    description:
+      - List of full paths to get the facts of in a single run, instead of C(path).
+      - Results are returned in C(stats), keyed by path. Mime types and attributes are looked up
+        with one C(file) and one C(lsattr) run for all of the paths.
+      - A path that cannot be looked at, for instance for lack of permissions, does not fail the
+        task, its entry is C(exists=null) with the reason in C(error).
+    required: false
+    default: null
+    version_added: "2.3"
   follow:
     description:
       - Whether to follow symlinks
@@ -53,12 +64,21 @@ options:
     default: sha1
     aliases: [ 'checksum_algo', 'checksum' ]
     version_added: "2.0"
+  checksum_algorithms:
+    description:
+      - List of algorithms to compute digests with, returned in C(checksums). The file is read only
+        once, together with C(get_md5) and C(get_checksum), whatever the number of algorithms.
+    required: false
+    default: null
+    version_added: "2.3"
   get_mime:
     description:
       - Use file magic and return data about the nature of the file. this uses
         the 'file' utility found on most Linux/Unix systems.
       - This will add both `mime_type` and 'charset' fields to the return, if possible.
       - In 2.3 this option changed from 'mime' to 'get_mime' and the default changed to 'Yes'
+      - Since 2.3 special files, empty files and a few common binary formats are recognized
+        without running 'file', which is only used for everything else.
     required: false
     choices: [ Yes, No ]
     default: Yes
@@ -67,10 +87,26 @@ options:
   get_attributes:
     description:
       - Get file attributes using lsattr tool if present.
+      - On Linux the attributes are read directly with the FS_IOC_GETFLAGS ioctl, lsattr is
+        only used when that is not possible.
     required: false
     default: True
     version_added: "2.3"
     aliases: [ 'attributes', 'attr' ]
+  checksum_cache:
+    description:
+      - Path to an on-host cache of file digests. When set, C(md5) and C(checksum) are looked up by
+        the device, inode, size, mtime and ctime of the file and only computed on a cache miss.
+      - The cache file should only be writable by the user running the module.
+    required: false
+    default: null
+    version_added: "2.3"
+  checksum_cache_size:
+    description:
+      - Maximum number of digests kept in C(checksum_cache), least recently used ones are evicted first.
+    required: false
+    default: 10000
+    version_added: "2.3"
 author: "Bruce Pennypacker (@bpennypacker)"
 '''
 
@@ -128,6 +164,33 @@ EXAMPLES = '''
 - stat:
     path: /path/to/something
     checksum_algorithm: sha256
+
+# Get sha256 and md5 of a big file in a single read
+- stat:
+    path: /srv/images/base.qcow2
+    get_md5: no
+    get_checksum: no
+    checksum_algorithms:
+      - sha256
+      - md5
+
+# Audit many paths in one go
+- stat:
+    paths:
+      - /etc/passwd
+      - /etc/shadow
+      - /etc/sudoers
+    get_md5: no
+  register: audit
+- fail:
+    msg: "{{ item.key }} is world writable"
+  when: item.value.woth | default(False)
+  with_dict: "{{ audit.stats }}"
+
+# Reuse digests of unchanged files between runs
+- stat:
+    path: /srv/images/base.qcow2
+    checksum_cache: /var/cache/ansible/checksums.json
 '''
 
 RETURN = '''
@@ -303,6 +366,13 @@ stat:
                 hashing and supplied checksum algorithm is available
             type: string
             sample: 50ba294cdf28c0d5bcde25708df53346825a429f
+        checksums:
+            description: digests of the path, keyed by algorithm
+            returned: success, path exists, user can read stats, path supports
+                hashing and checksum_algorithms was given
+            type: dictionary
+            sample: { md5: f88fa92d8cf2eeecf4c0a50ccc96d0c0, sha256: 5bb9d8014a0f9b1d61e21e796d78dccdf1352f23cd32812f4850b878ae4944c }
+            version_added: 2.3
         pw_name:
             description: User name of owner
             returned: success, path exists and user can read stats and installed python supports it
@@ -351,6 +421,23 @@ stat:
             type: boolean
             sample: [ immutable, extent ]
             version_added: 2.3
+stats:
+    description: dictionary of stat data (as in C(stat)) keyed by path
+    returned: success, when paths was given
+    type: dictionary
+    sample: { "/etc/passwd": { exists: True, mode: "0644", "...": "..." }, "/etc/nope": { exists: False },
+              "/root/.ssh/id_rsa": { exists: null, error: "Permission denied" } }
+    version_added: 2.3
+checksum_cache_hits:
+    description: number of digests answered from C(checksum_cache)
+    returned: when checksum_cache is set
+    type: int
+    sample: 2
+checksum_cache_misses:
+    description: number of digests that had to be computed by reading the file
+    returned: when checksum_cache is set
+    type: int
+    sample: 0
 '''
 
 import errno
@@ -358,12 +445,201 @@ import grp
 import os
 import pwd
 import stat
+import struct
+import sys
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
 
 # import module snippets
-from ansible.module_utils.basic import AnsibleModule, format_attributes
+from ansible.module_utils.basic import AnsibleModule, AVAILABLE_HASH_ALGORITHMS, format_attributes
 from ansible.module_utils.pycompat24 import get_exception
 from ansible.module_utils._text import to_bytes
 
+# read size used when hashing files
+BUFSIZE = 64 * 1024
+
+# number of paths passed to a single 'file' or 'lsattr' run
+BATCH_SIZE = 512
+
+# mime types of non regular files, as reported by 'file -i'
+INODE_MIME_TYPES = (
+    (stat.S_ISLNK, 'inode/symlink'),
+    (stat.S_ISDIR, 'inode/directory'),
+    (stat.S_ISCHR, 'inode/chardevice'),
+    (stat.S_ISBLK, 'inode/blockdevice'),
+    (stat.S_ISFIFO, 'inode/fifo'),
+    (stat.S_ISSOCK, 'inode/socket'),
+)
+
+# leading bytes of formats whose mime type does not depend on the 'file' version
+MAGIC_MIME_TYPES = (
+    (to_bytes('%PDF-'), 'application/pdf'),
+    (to_bytes('\x89PNG\r\n\x1a\n', encoding='latin-1'), 'image/png'),
+    (to_bytes('GIF87a'), 'image/gif'),
+    (to_bytes('GIF89a'), 'image/gif'),
+    (to_bytes('\xff\xd8\xff', encoding='latin-1'), 'image/jpeg'),
+    (to_bytes('BZh'), 'application/x-bzip2'),
+    (to_bytes('\xfd7zXZ\x00', encoding='latin-1'), 'application/x-xz'),
+)
+
+# ELF e_type values, shared objects are left to 'file' as newer versions call PIE executables x-pie-executable
+ELF_MIME_TYPES = {
+    1: 'application/x-object',
+    2: 'application/x-executable',
+    4: 'application/x-coredump',
+}
+
+# ext2 style inode flags in the order lsattr prints them
+INODE_FLAGS = (
+    (0x00000001, 's'), (0x00000002, 'u'), (0x00000008, 'S'), (0x00010000, 'D'),
+    (0x00000010, 'i'), (0x00000020, 'a'), (0x00000040, 'd'), (0x00000080, 'A'),
+    (0x00000004, 'c'), (0x00000800, 'E'), (0x00004000, 'j'), (0x00001000, 'I'),
+    (0x00008000, 't'), (0x00020000, 'T'), (0x00080000, 'e'), (0x00800000, 'C'),
+    (0x02000000, 'x'), (0x40000000, 'F'), (0x10000000, 'N'), (0x20000000, 'P'),
+    (0x00100000, 'V'),
+)
+
+# architectures using the generic ioctl number layout
+GENERIC_IOCTL_MACHINES = ('x86', 'i386', 'i486', 'i586', 'i686', 'aarch64', 'arm', 's390', 'riscv')
+
+
+def _ior(ioc_type, nr):
+    '''_IOR() for a long argument, generic ioctl layout'''
+    return (2 << 30) | (struct.calcsize('l') << 16) | (ord(ioc_type) << 8) | nr
+
+
+def digest_file(path, algorithms):
+    '''
+    Read path once, feeding every block to one hash object per algorithm.
+    Returns a dict of hex digests; algorithms this host cannot use (md5 on
+    FIPS systems, for instance) map to None.
+    '''
+    hashes = {}
+    for algorithm in algorithms:
+        try:
+            hashes[algorithm] = AVAILABLE_HASH_ALGORITHMS[algorithm]()
+        except (KeyError, ValueError):
+            pass
+
+    digests = dict([(algorithm, None) for algorithm in algorithms])
+    if hashes:
+        f = open(path, 'rb')
+        try:
+            block = f.read(BUFSIZE)
+            while block:
+                for h in hashes.values():
+                    h.update(block)
+                block = f.read(BUFSIZE)
+        finally:
+            f.close()
+
+        for algorithm, h in hashes.items():
+            digests[algorithm] = h.hexdigest()
+
+    return digests
+
+
+class ChecksumCache(object):
+    '''
+    Persistent on-host digest cache, keyed on the device, inode, size, mtime
+    and ctime of each file so a digest is only reused while the file is
+    untouched. The least recently used entries beyond max_entries are dropped.
+    '''
+
+    # files modified this recently can change again without changing their key
+    RACY_WINDOW = 2
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            f = open(path)
+            try:
+                data = json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            data = None
+        if isinstance(data, dict):
+            # anything but [digest, last use] is a miss
+            for k, entry in data.items():
+                if isinstance(entry, list) and len(entry) == 2 and isinstance(entry[1], (int, float)):
+                    self.entries[k] = entry
+
+    def digests(self, path, algorithms):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return digest_file(path, algorithms)
+
+        stamp = (st.st_dev, st.st_ino, st.st_size, st.st_mtime, st.st_ctime)
+        key = '%d:%d:%d:%r:%r:' % stamp
+        now = time.time()
+        found = {}
+        for algorithm in algorithms:
+            entry = self.entries.get(key + algorithm)
+            if entry is not None:
+                entry[1] = now
+                found[algorithm] = entry[0]
+        missing = [algorithm for algorithm in algorithms if algorithm not in found]
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        if missing:
+            computed = digest_file(path, missing)
+            found.update(computed)
+            try:
+                st = os.stat(path)
+                unchanged = (st.st_dev, st.st_ino, st.st_size, st.st_mtime, st.st_ctime) == stamp
+            except OSError:
+                unchanged = False
+            if unchanged and now - max(stamp[3], stamp[4]) > self.RACY_WINDOW:
+                for algorithm, digest in computed.items():
+                    if digest is not None:
+                        self.entries[key + algorithm] = [digest, now]
+        return found
+
+    def save(self):
+        ''' best effort, failing to persist the cache only costs a rehash next time '''
+        if not self.hits and not self.misses:
+            return
+        lru = sorted(self.entries, key=lambda k: self.entries[k][1])
+        for k in lru[:max(0, len(self.entries) - self.max_entries)]:
+            del self.entries[k]
+
+        cache_dir = os.path.dirname(self.path)
+        tmp = None
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir, int('0700', 8))
+            fd, tmp = tempfile.mkstemp(dir=cache_dir)
+            f = os.fdopen(fd, 'w')
+            try:
+                json.dump(self.entries, f)
+            finally:
+                f.close()
+            os.rename(tmp, self.path)
+        except (IOError, OSError):
+            if tmp is not None and os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def results(self):
+        return dict(checksum_cache_hits=self.hits, checksum_cache_misses=self.misses)
+
+
 def format_output(module, path, st):
     mode = st.st_mode
 
@@ -427,44 +703,32 @@ def format_output(module, path, st):
     return output
 
 
-def main():
-    module = AnsibleModule(
-        argument_spec=dict(
-            path=dict(required=True, type='path'),
-            follow=dict(default='no', type='bool'),
-            get_md5=dict(default='yes', type='bool'),
-            get_checksum=dict(default='yes', type='bool'),
-            get_mime=dict(default=True, type='bool', aliases=['mime', 'mime_type', 'mime-type']),
-            get_attributes=dict(default=True, type='bool', aliases=['attributes', 'attr']),
-            checksum_algorithm=dict(default='sha1', type='str',
-                                    choices=['sha1', 'sha224', 'sha256', 'sha384', 'sha512'],
-                                    aliases=['checksum_algo', 'checksum']),
-        ),
-        supports_check_mode=True
-    )
-
-    path = module.params.get('path')
+def stat_path(module, path, cache=None, bulk=False):
+    '''
+    stat data and digests of a single path, {'exists': False} if it is missing.
+    With bulk, a path that cannot be looked at gives {'exists': None, 'error': ...}
+    instead of failing the module.
+    '''
     b_path = to_bytes(path, errors='surrogate_or_strict')
-    follow = module.params.get('follow')
-    get_mime = module.params.get('get_mime')
-    get_attr = module.params.get('get_attributes')
     get_md5 = module.params.get('get_md5')
     get_checksum = module.params.get('get_checksum')
     checksum_algorithm = module.params.get('checksum_algorithm')
+    checksum_algorithms = module.params.get('checksum_algorithms') or []
 
     # main stat data
     try:
-        if follow:
+        if module.params.get('follow'):
             st = os.stat(b_path)
         else:
             st = os.lstat(b_path)
     except OSError:
         e = get_exception()
         if e.errno == errno.ENOENT:
-            output = {'exists': False}
-            module.exit_json(changed=False, stat=output)
+            return {'exists': False}
+        if bulk:
+            return {'exists': None, 'error': e.strerror}
 
-        module.fail_json(msg=e.strerror)
+        module.fail_json(msg=e.strerror, path=path)
 
     # process base results
     output = format_output(module, path, st)
@@ -489,44 +753,294 @@ def main():
     except:
         pass
 
-    # checksums
+    # checksums, all computed from a single read of the file
     if output.get('isreg') and output.get('readable'):
+        algorithms = []
         if get_md5:
-            # Will fail on FIPS-140 compliant systems
-            try:
-                output['md5'] = module.md5(path)
-            except ValueError:
-                output['md5'] = None
-
+            algorithms.append('md5')
         if get_checksum:
-            output['checksum'] = module.digest_from_file(path, checksum_algorithm)
+            if checksum_algorithm not in AVAILABLE_HASH_ALGORITHMS:
+                module.fail_json(msg="Could not hash file '%s' with algorithm '%s'. Available algorithms: %s" %
+                                 (path, checksum_algorithm, ', '.join(AVAILABLE_HASH_ALGORITHMS)))
+            algorithms.append(checksum_algorithm)
+        for algorithm in checksum_algorithms:
+            if algorithm not in algorithms:
+                algorithms.append(algorithm)
 
-    # try to get mime data if requested
-    if get_mime:
-        output['mimetype'] = output['charset'] = 'unknown'
-        mimecmd = module.get_bin_path('file')
-        if mimecmd:
-            mimecmd = [mimecmd, '-i', path]
+        if algorithms:
+            if cache:
+                digests = cache.digests(b_path, algorithms)
+            else:
+                digests = digest_file(b_path, algorithms)
+
+            if get_md5:
+                # None on FIPS-140 compliant systems
+                output['md5'] = digests['md5']
+            if get_checksum:
+                output['checksum'] = digests[checksum_algorithm]
+            if checksum_algorithms:
+                output['checksums'] = dict([(algorithm, digests[algorithm]) for algorithm in checksum_algorithms])
+
+    return output
+
+
+def get_mime_types(module, paths):
+    '''
+    Return a dict of path: (mimetype, charset), using one 'file' run per
+    BATCH_SIZE paths. Paths 'file' could not classify are left out.
+    '''
+    mimes = {}
+    mimecmd = module.get_bin_path('file')
+    if not mimecmd:
+        return mimes
+
+    for i in range(0, len(paths), BATCH_SIZE):
+        batch = paths[i:i + BATCH_SIZE]
+        try:
+            # brief output is exactly one line per path, whatever the path looks like
+            rc, out, err = module.run_command([mimecmd, '-b', '-i', '--'] + batch)
+        except:
+            continue
+
+        lines = out.splitlines()
+        if rc != 0 or len(lines) != len(batch):
+            continue
+
+        for path, line in zip(batch, lines):
             try:
-                rc, out, err = module.run_command(mimecmd)
-                if rc == 0:
-                    mimetype, charset = out.split(':')[1].split(';')
-                    output['mimetype'] = mimetype.strip()
-                    output['charset'] = charset.split('=')[1].strip()
-            except:
+                mimetype, charset = line.split(';')
+                mimes[path] = (mimetype.strip(), charset.split('=')[1].strip())
+            except (ValueError, IndexError):
                 pass
 
+    return mimes
+
+
+def get_attributes(module, paths):
+    '''
+    Return a dict of path: {version, attributes, attr_flags}, using one
+    'lsattr' run per BATCH_SIZE paths.
+    '''
+    attrs = {}
+    attrcmd = module.get_bin_path('lsattr')
+    if not attrcmd:
+        return attrs
+
+    for i in range(0, len(paths), BATCH_SIZE):
+        batch = paths[i:i + BATCH_SIZE]
+        try:
+            # lsattr exits non zero if any path failed, but still reports the others
+            rc, out, err = module.run_command([attrcmd, '-vd', '--'] + batch)
+        except:
+            continue
+
+        for line in out.splitlines():
+            fields = line.split(None, 2)
+            if len(fields) != 3:
+                continue
+            flags = fields[1].replace('-', '').strip()
+            attrs[fields[2]] = dict(
+                version=fields[0].strip(),
+                attr_flags=flags,
+                attributes=format_attributes(flags),
+            )
+
+    return attrs
+
+
+def sniff_mime_type(path):
+    '''
+    Guess the mime type and charset 'file -i' would report for path, for
+    special files, empty files and a few binary formats.
+    Returns None when 'file' has to be asked instead.
+    '''
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+
+    for test, mimetype in INODE_MIME_TYPES:
+        if test(st.st_mode):
+            return (mimetype, 'binary')
+
+    if not stat.S_ISREG(st.st_mode):
+        return None
+
+    if st.st_size == 0:
+        return ('inode/x-empty', 'binary')
+
+    try:
+        f = open(path, 'rb')
+        try:
+            head = f.read(64)
+            for magic, mimetype in MAGIC_MIME_TYPES:
+                if head.startswith(magic):
+                    return (mimetype, 'binary')
+
+            if head.startswith(to_bytes('\x7fELF')) and len(head) >= 18:
+                if head[5:6] == to_bytes('\x02'):
+                    e_type = struct.unpack('>H', head[16:18])[0]
+                else:
+                    e_type = struct.unpack('<H', head[16:18])[0]
+                if e_type in ELF_MIME_TYPES:
+                    return (ELF_MIME_TYPES[e_type], 'binary')
+                return None
+        finally:
+            f.close()
+    except (IOError, OSError):
+        return None
+
+    # text, and any other format, is left to 'file' and its own set of types
+    return None
+
+
+def read_attributes(path):
+    '''
+    Read inode flags and generation the way 'lsattr -vd' does, through the
+    FS_IOC_GETFLAGS and FS_IOC_GETVERSION ioctls. Returns an empty dict when
+    lsattr would fail too and None when lsattr has to be asked instead.
+    '''
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return None
+
+    machine = os.uname()[4]
+    for prefix in GENERIC_IOCTL_MACHINES:
+        if machine.startswith(prefix):
+            break
+    else:
+        return None
+
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return {}
+
+    # lsattr only supports regular files and directories
+    if not (stat.S_ISREG(st.st_mode) or stat.S_ISDIR(st.st_mode)):
+        return {}
+
+    buf = struct.pack('l', 0)
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK | getattr(os, 'O_NOFOLLOW', 0))
+        try:
+            # the kernel only writes an int, whatever the size of the argument
+            flags = struct.unpack('I', fcntl.ioctl(fd, _ior('f', 1), buf)[:4])[0]
+            version = struct.unpack('I', fcntl.ioctl(fd, _ior('v', 1), buf)[:4])[0]
+        finally:
+            os.close(fd)
+    except (IOError, OSError):
+        return {}
+
+    attr_flags = ''
+    for bit, letter in INODE_FLAGS:
+        if flags & bit:
+            attr_flags += letter
+            flags &= ~bit
+
+    # flags this table does not know about are printed differently by each lsattr version
+    if flags:
+        return None
+
+    return dict(version=str(version), attr_flags=attr_flags, attributes=format_attributes(attr_flags))
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            path=dict(required=False, type='path'),
+            paths=dict(required=False, type='list'),
+            follow=dict(default='no', type='bool'),
+            get_md5=dict(default='yes', type='bool'),
+            get_checksum=dict(default='yes', type='bool'),
+            get_mime=dict(default=True, type='bool', aliases=['mime', 'mime_type', 'mime-type']),
+            get_attributes=dict(default=True, type='bool', aliases=['attributes', 'attr']),
+            checksum_algorithm=dict(default='sha1', type='str',
+                                    choices=['sha1', 'sha224', 'sha256', 'sha384', 'sha512'],
+                                    aliases=['checksum_algo', 'checksum']),
+            checksum_algorithms=dict(default=None, type='list'),
+            checksum_cache=dict(default=None, type='path'),
+            checksum_cache_size=dict(default=10000, type='int'),
+        ),
+        required_one_of=[['path', 'paths']],
+        mutually_exclusive=[['path', 'paths']],
+        supports_check_mode=True
+    )
+
+    get_mime = module.params.get('get_mime')
+    get_attr = module.params.get('get_attributes')
+    checksum_algorithms = module.params.get('checksum_algorithms') or []
+
+    for algorithm in checksum_algorithms:
+        if algorithm not in AVAILABLE_HASH_ALGORITHMS:
+            module.fail_json(msg="Unsupported checksum algorithm '%s'. Available algorithms: %s" %
+                             (algorithm, ', '.join(AVAILABLE_HASH_ALGORITHMS)))
+
+    cache = None
+    if module.params.get('checksum_cache'):
+        cache = ChecksumCache(module.params['checksum_cache'], module.params['checksum_cache_size'])
+
+    if module.params.get('paths') is None:
+        paths = [module.params.get('path')]
+    else:
+        paths = []
+        seen = set()
+        for path in module.params.get('paths'):
+            path = os.path.expanduser(os.path.expandvars(path))
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+
+    outputs = {}
+    for path in paths:
+        outputs[path] = stat_path(module, path, cache, bulk=module.params.get('paths') is not None)
+
+    existing = [path for path in paths if outputs[path]['exists']]
+
+    # try to get mime data if requested
+    if get_mime and existing:
+        mimes = {}
+        unknown = []
+        for path in existing:
+            mime = sniff_mime_type(to_bytes(path, errors='surrogate_or_strict'))
+            if mime is None:
+                unknown.append(path)
+            else:
+                mimes[path] = mime
+        if unknown:
+            mimes.update(get_mime_types(module, unknown))
+
+        for path in existing:
+            outputs[path]['mimetype'], outputs[path]['charset'] = mimes.get(path, ('unknown', 'unknown'))
+
     # try to get attr data
-    if get_attr:
-        output['version'] = None
-        output['attributes'] = []
-        output['attr_flags'] = ''
-        out = module.get_file_attributes(path)
-        for x in ('version', 'attributes', 'attr_flags'):
-            if x in out:
-                output[x] = out[x]
-
-    module.exit_json(changed=False, stat=output)
+    if get_attr and existing:
+        attrs = {}
+        unknown = []
+        for path in existing:
+            attr = read_attributes(to_bytes(path, errors='surrogate_or_strict'))
+            if attr is None:
+                unknown.append(path)
+            else:
+                attrs[path] = attr
+        if unknown:
+            attrs.update(get_attributes(module, unknown))
+
+        for path in existing:
+            output = outputs[path]
+            output['version'] = None
+            output['attributes'] = []
+            output['attr_flags'] = ''
+            output.update(attrs.get(path, {}))
+
+    if module.params.get('paths') is None:
+        results = dict(changed=False, stat=outputs[paths[0]])
+    else:
+        results = dict(changed=False, stats=outputs)
+    if cache:
+        cache.save()
+        results.update(cache.results())
+
+    module.exit_json(**results)
 
 if __name__ == '__main__':
     main()
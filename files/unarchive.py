@@ -97,15 +97,36 @@ options:
     default: "yes"
     choices: ["yes", "no"]
     version_added: "2.2"
+  manifest:
+    description:
+      - After unpacking, write a manifest of the unpacked files into C(dest), named after the archive
+        (C(.ansible_unarchive_<archive name>.json)). It records the checksum of the archive, the
+        relevant options and the size, mtime, mode and ownership of every unpacked path.
+      - On later runs, if the archive checksum, the options and the recorded metadata of every path
+        still match, the module reports no change without opening the archive.
+    required: false
+    default: "no"
+    choices: ["yes", "no"]
+    version_added: "2.3"
+  workers:
+    description:
+      - Number of threads decompressing the members of a I(.zip) file when it is unpacked
+        with python's zipfile, i.e. when no C(extra_opts) are given.
+    required: false
+    default: 1
+    version_added: "2.3"
 author: "Dag Wieers (@dagwieers)"
 todo:
     - re-implement tar support using native tarfile module
     - re-implement zip support using native zipfile module
 notes:
-    - requires C(gtar)/C(unzip) command on target host
-    - can handle I(.zip) files using C(unzip) as well as I(.tar), I(.tar.gz), I(.tar.bz2) and I(.tar.xz) files using C(gtar)
-    - uses gtar's C(--diff arg) to calculate if changed or not. If this C(arg) is not
-      supported, it will always unpack the archive
+    - requires C(gtar) command on target host, C(unzip) is only required for I(.zip) files when C(extra_opts) are given
+    - can handle I(.zip) files using python's C(zipfile) or C(unzip) as well as I(.tar), I(.tar.gz), I(.tar.bz2) and I(.tar.xz) files using C(gtar)
+    - compares the member headers read with python's C(zipfile)/C(tarfile) against the
+      files in the destination to calculate if changed or not. File contents are only read
+      when the metadata is ambiguous.
+    - uses gtar's C(--diff arg) instead when C(extra_opts) is given or python cannot read the
+      archive. If this C(arg) is not supported, it will always unpack the archive
     - existing files/directories in the destination which are not in the archive
       are not touched.  This is the same behavior as a normal archive extraction
     - existing files/directories in the destination which are not in the archive
@@ -124,6 +145,13 @@ EXAMPLES = '''
     dest: /usr/local/bin
     remote_src: yes
 
+# Skip inspecting a large archive on reruns when nothing changed
+- unarchive:
+    src: /srv/releases/app-1.2.3.tar.gz
+    dest: /opt/app
+    remote_src: yes
+    manifest: yes
+
 # Unarchive a file that needs to be downloaded (added in 2.0)
 - unarchive:
     src: "https://example.com/example.zip"
@@ -140,6 +168,12 @@ import datetime
 import time
 import binascii
 import codecs
+import errno
+import fnmatch
+import struct
+import tarfile
+import tempfile
+import threading
 from zipfile import ZipFile, BadZipfile
 from ansible.module_utils._text import to_text
 
@@ -148,6 +182,16 @@ try:  # python 3.3+
 except ImportError:  # older python
     from pipes import quote
 
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+try:  # python 2
+    long
+except NameError:  # python 3
+    long = int
+
 # String from tar that shows the tar contents are different from the
 # filesystem
 OWNER_DIFF_RE = re.compile(r': Uid differs$')
@@ -161,10 +205,39 @@ ZIP_FILE_MODE_RE = re.compile(r'([r-][w-][SsTtx-]){3}')
 # When downloading an archive, how much of the archive to download before
 # saving to a tempfile (64k)
 BUFSIZE = 65536
+# zip 'extended timestamp' extra field, holds the exact unix mtime
+ZIP_EXTENDED_TIMESTAMP = 0x5455
+# zip 'version made by' host system for unix
+ZIP_SYSTEM_UNIX = 3
+# manifest of the unpacked files, written into dest
+MANIFEST_NAME = '.ansible_unarchive_%s.json'
+# options that change what unpacking produces, a manifest is only valid for the same values
+MANIFEST_PARAMS = ('owner', 'group', 'mode', 'exclude', 'extra_opts', 'keep_newer')
 
 def crc32(path):
     ''' Return a CRC32 checksum of a file '''
-    return binascii.crc32(open(path).read()) & 0xffffffff
+    crc = 0
+    f = open(path, 'rb')
+    try:
+        data = f.read(BUFSIZE)
+        while data:
+            crc = binascii.crc32(data, crc)
+            data = f.read(BUFSIZE)
+    finally:
+        f.close()
+    return crc & 0xffffffff
+
+def preallocate(fd, size):
+    ''' Reserve the space for a file of the given size before writing it, where supported '''
+    if size <= 0:
+        return
+    try:
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(fd, 0, size)
+        else:
+            os.ftruncate(fd, size)
+    except OSError:
+        pass
 
 def shell_escape(string):
     ''' Quote meta-characters in the args for the unix shell '''
@@ -173,6 +246,48 @@ def shell_escape(string):
 class UnarchiveError(Exception):
     pass
 
+
+class DestIndex(object):
+    '''
+    Directory listing cache for the destination. Each directory is read once
+    with scandir (listdir on older pythons) and looking up a path that does
+    not exist costs no stat call at all.
+    '''
+
+    def __init__(self, dest):
+        self.dest = dest
+        self._dirs = {}
+
+    def _scan(self, directory):
+        entries = {}
+        try:
+            if hasattr(os, 'scandir'):
+                for entry in os.scandir(directory):
+                    entries[entry.name] = entry
+            else:
+                for name in os.listdir(directory):
+                    entries[name] = None
+        except OSError:
+            pass
+        return entries
+
+    def lstat(self, path):
+        ''' lstat() a path relative to dest, raising OSError(ENOENT) if it does not exist '''
+        fullpath = os.path.normpath(os.path.join(self.dest, path))
+        if fullpath == os.path.normpath(self.dest):
+            return os.lstat(fullpath)
+
+        directory, name = os.path.split(fullpath)
+        if directory not in self._dirs:
+            self._dirs[directory] = self._scan(directory)
+
+        entries = self._dirs[directory]
+        if name not in entries:
+            raise OSError(errno.ENOENT, 'No such file or directory', fullpath)
+        if entries[name] is None:
+            return os.lstat(fullpath)
+        return entries[name].stat(follow_symlinks=False)
+
 # class to handle .zip files
 class ZipArchive(object):
 
@@ -237,8 +352,129 @@ class ZipArchive(object):
                 archive.close()
                 raise UnarchiveError('Unable to list files in the archive')
 
+            archive.close()
         return self._infodict[path]
 
+    def _zipinfo_timestamp(self, item):
+        ''' Member mtime, from the extended timestamp field if present as unzip restores that one '''
+        extra = item.extra
+        while len(extra) >= 4:
+            tag, size = struct.unpack('<HH', extra[:4])
+            if tag == ZIP_EXTENDED_TIMESTAMP and size >= 5 and ord(extra[4:5]) & 1:
+                return float(struct.unpack('<i', extra[5:9])[0])
+            extra = extra[4 + size:]
+        # DOS timestamps are in local time
+        return time.mktime(item.date_time + (0, 0, -1))
+
+    def _member_list(self):
+        '''
+        Return (path, ftype, special, perm, size, timestamp, crc) for every member,
+        read from the central directory with python's zipfile. Returns None when
+        zipfile cannot read the archive.
+        '''
+        try:
+            archive = ZipFile(self.src)
+        except BadZipfile:
+            return None
+
+        members = []
+        try:
+            for item in archive.infolist():
+                path = to_text(item.filename, errors='surrogate_or_strict')
+                ftype, special, perm = self._zipinfo_type(item)
+                members.append((path, ftype, special, perm, item.file_size, self._zipinfo_timestamp(item), long(item.CRC)))
+        finally:
+            archive.close()
+
+        return members
+
+    def _zipinfo_type(self, item):
+        ''' Return (ftype, special, perm) of a member the way unzip unpacks it '''
+        mode = item.external_attr >> 16
+        special = False
+        if item.create_system == ZIP_SYSTEM_UNIX and mode:
+            if stat.S_ISDIR(mode) or item.filename.endswith('/'):
+                ftype = 'd'
+            elif stat.S_ISLNK(mode):
+                ftype = 'L'
+            else:
+                ftype = 'f'
+                # unzip lists these with type '?' and does not apply the umask to them
+                special = not stat.S_ISREG(mode)
+            perm = stat.S_IMODE(mode) & int('0777', 8)
+        elif item.filename.endswith('/'):
+            # FAT style attributes, unzip makes these world writable before the umask
+            ftype = 'd'
+            perm = int('0777', 8)
+        else:
+            ftype = 'f'
+            perm = int('0666', 8)
+        return ftype, special, perm
+
+    def _is_excluded(self, name):
+        ''' Whether a member matches one of the exclude patterns, like unzip -x '''
+        for pattern in self.excludes:
+            if name == pattern or fnmatch.fnmatch(name, pattern):
+                return True
+        return False
+
+    def _unzip_member_list(self, out):
+        ''' Same as _member_list(), parsed from the output of 'unzip -ZT -s' '''
+        members = []
+        for line in out.splitlines():
+            pcs = line.split(None, 7)
+            if len(pcs) != 8:
+                # Too few fields... probably a piece of the header or footer
+                continue
+
+            # Check first and seventh field in order to skip header/footer
+            if len(pcs[0]) != 7 and len(pcs[0]) != 10: continue
+            if len(pcs[6]) != 15: continue
+
+            # Possible entries:
+            #   -rw-rws---  1.9 unx    2802 t- defX 11-Aug-91 13:48 perms.2660
+            #   -rw-a--     1.0 hpf    5358 Tl i4:3  4-Dec-91 11:33 longfilename.hpfs
+            #   -r--ahs     1.1 fat    4096 b- i4:2 14-Jul-91 12:58 EA DATA. SF
+            #   --w-------  1.0 mac   17357 bx i8:2  4-May-92 04:02 unzip.macr
+            if pcs[0][0] not in 'dl-?' or not frozenset(pcs[0][1:]).issubset('rwxstah-'):
+                continue
+
+            ztype = pcs[0][0]
+            permstr = pcs[0][1:]
+            size = int(pcs[3])
+            path = to_text(pcs[7], errors='surrogate_or_strict')
+
+            # Itemized change requires L for symlink
+            if path[-1] == '/':
+                ftype = 'd'
+            elif ztype == 'l':
+                ftype = 'L'
+            else:
+                ftype = 'f'
+
+            # Some files may be storing FAT permissions, not Unix permissions
+            if len(permstr) == 6:
+                if path[-1] == '/':
+                    permstr = 'rwxrwxrwx'
+                elif permstr == 'rwx---':
+                    permstr = 'rwxrwxrwx'
+                else:
+                    permstr = 'rw-rw-rw-'
+
+            # Test string conformity
+            if len(permstr) != 9 or not ZIP_FILE_MODE_RE.match(permstr):
+                raise UnarchiveError('ZIP info perm format incorrect, %s' % permstr)
+
+            # Note: this timestamp calculation has a rounding error
+            # somewhere... unzip and this timestamp can be one second off
+            # When that happens, we report a change and re-unzip the file
+            dt_object = datetime.datetime(*(time.strptime(pcs[6], '%Y%m%d.%H%M%S')[0:6]))
+            timestamp = time.mktime(dt_object.timetuple())
+
+            members.append((path, ftype, ztype == '?', self._permstr_to_octal(permstr, 0), size, timestamp, None))
+
+        return members
+
     @property
     def files_in_archive(self, force_refresh=False):
         if self._files_in_archive and not force_refresh:
@@ -268,12 +504,18 @@ class ZipArchive(object):
         return self._files_in_archive
 
     def is_unarchived(self):
-        cmd = [ self.cmd_path, '-ZT', '-s', self.src ]
-        if self.excludes:
-            cmd.extend([ ' -x ', ] + self.excludes)
-        rc, out, err = self.module.run_command(cmd)
+        cmd = None
+        rc = 0
+        err = ''
+        members = self._member_list()
+        if members is None:
+            # Python2.4 can't handle zipfiles with > 64K files, use unzip instead
+            cmd = [ self.cmd_path, '-ZT', '-s', self.src ]
+            if self.excludes:
+                cmd.extend([ ' -x ', ] + self.excludes)
+            rc, out, err = self.module.run_command(cmd)
+            members = self._unzip_member_list(out)
 
-        old_out = out
         diff = ''
         out = ''
         if rc == 0:
@@ -336,69 +578,19 @@ class ZipArchive(object):
                 pass
             fut_gid = run_gid
 
-        for line in old_out.splitlines():
-            change = False
-
-            pcs = line.split(None, 7)
-            if len(pcs) != 8:
-                # Too few fields... probably a piece of the header or footer
-                continue
+        index = DestIndex(self.dest)
 
-            # Check first and seventh field in order to skip header/footer
-            if len(pcs[0]) != 7 and len(pcs[0]) != 10: continue
-            if len(pcs[6]) != 15: continue
-
-            # Possible entries:
-            #   -rw-rws---  1.9 unx    2802 t- defX 11-Aug-91 13:48 perms.2660
-            #   -rw-a--     1.0 hpf    5358 Tl i4:3  4-Dec-91 11:33 longfilename.hpfs
-            #   -r--ahs     1.1 fat    4096 b- i4:2 14-Jul-91 12:58 EA DATA. SF
-            #   --w-------  1.0 mac   17357 bx i8:2  4-May-92 04:02 unzip.macr
-            if pcs[0][0] not in 'dl-?' or not frozenset(pcs[0][1:]).issubset('rwxstah-'):
-                continue
-
-            ztype = pcs[0][0]
-            permstr = pcs[0][1:]
-            version = pcs[1]
-            ostype = pcs[2]
-            size = int(pcs[3])
-            path = to_text(pcs[7], errors='surrogate_or_strict')
+        for path, ftype, special, perm, size, timestamp, crc in members:
+            change = False
 
             # Skip excluded files
             if path in self.excludes:
                 out += 'Path %s is excluded on request\n' % path
                 continue
 
-            # Itemized change requires L for symlink
-            if path[-1] == '/':
-                if ztype != 'd':
-                    err += 'Path %s incorrectly tagged as "%s", but is a directory.\n' % (path, ztype)
-                ftype = 'd'
-            elif ztype == 'l':
-                ftype = 'L'
-            elif ztype == '-':
-                ftype = 'f'
-            elif ztype == '?':
-                ftype = 'f'
-
-            # Some files may be storing FAT permissions, not Unix permissions
-            if len(permstr) == 6:
-                if path[-1] == '/':
-                    permstr = 'rwxrwxrwx'
-                elif permstr == 'rwx---':
-                    permstr = 'rwxrwxrwx'
-                else:
-                    permstr = 'rw-rw-rw-'
-
-            # Test string conformity
-            if len(permstr) != 9 or not ZIP_FILE_MODE_RE.match(permstr):
-                raise UnarchiveError('ZIP info perm format incorrect, %s' % permstr)
-
-            # DEBUG
-#            err += "%s%s %10d %s\n" % (ztype, permstr, size, path)
-
             dest = os.path.join(self.dest, path)
             try:
-                st = os.lstat(dest)
+                st = index.lstat(path)
             except:
                 change = True
                 self.includes.append(path)
@@ -431,11 +623,20 @@ class ZipArchive(object):
 
             itemized = list('.%s.......??' % ftype)
 
-            # Note: this timestamp calculation has a rounding error
-            # somewhere... unzip and this timestamp can be one second off
-            # When that happens, we report a change and re-unzip the file
-            dt_object = datetime.datetime(*(time.strptime(pcs[6], '%Y%m%d.%H%M%S')[0:6]))
-            timestamp = time.mktime(dt_object.timetuple())
+            # Compare file contents only when the metadata is ambiguous: same
+            # size, but a timestamp off by less than the 2 second resolution
+            # of zip. The CRC recorded in the archive is compared with the file,
+            # the archive member itself is never decompressed.
+            if stat.S_ISREG(st.st_mode) and size == st.st_size and timestamp != st.st_mtime \
+                    and abs(timestamp - st.st_mtime) <= 2:
+                if crc is None:
+                    crc = self._crc32(path)
+                if crc32(dest) == crc:
+                    timestamp = st.st_mtime
+                else:
+                    change = True
+                    err += 'File %s differs in CRC32 checksum\n' % path
+                    itemized[2] = 'c'
 
             # Compare file timestamps
             if stat.S_ISREG(st.st_mode):
@@ -463,14 +664,6 @@ class ZipArchive(object):
                 err += 'File %s differs in size (%d vs %d)\n' % (path, size, st.st_size)
                 itemized[3] = 's'
 
-            # Compare file checksums
-            if stat.S_ISREG(st.st_mode):
-                crc = crc32(dest)
-                if crc != self._crc32(path):
-                    change = True
-                    err += 'File %s differs in CRC32 checksum (0x%08x vs 0x%08x)\n' % (path, self._crc32(path), crc)
-                    itemized[2] = 'c'
-
             # Compare file permissions
 
             # Do not handle permissions of symlinks
@@ -487,10 +680,10 @@ class ZipArchive(object):
                             e = get_exception()
                             self.module.fail_json(path=path, msg="mode %(mode)s must be in octal form" % self.file_args, details=str(e))
                 # Only special files require no umask-handling
-                elif ztype == '?':
-                    mode = self._permstr_to_octal(permstr, 0)
+                elif special:
+                    mode = perm
                 else:
-                    mode = self._permstr_to_octal(permstr, umask)
+                    mode = perm & ~umask
 
                 if mode != stat.S_IMODE(st.st_mode):
                     change = True
@@ -545,12 +738,142 @@ class ZipArchive(object):
         if self.includes:
             unarchived = False
 
-        # DEBUG
-#        out = old_out + out
-
         return dict(unarchived=unarchived, rc=rc, out=out, err=err, cmd=cmd, diff=diff)
 
+    def _native_unarchive(self):
+        '''
+        Unpack with python's zipfile, the way unzip -o does. Directories are
+        created first, then the members are decompressed by a pool of threads,
+        each with its own handle on the archive. Symlinks are only made once
+        all files are written, so no file is written through one. Returns None
+        when zipfile cannot do it.
+        '''
+        if not hasattr(ZipFile, 'open'):
+            return None
+        try:
+            archive = ZipFile(self.src)
+        except BadZipfile:
+            return None
+        try:
+            infolist = archive.infolist()
+        finally:
+            archive.close()
+
+        umask = os.umask(0)
+        os.umask(umask)
+
+        root = os.path.normpath(self.dest)
+        directories = []
+        parents = set()
+        members = []
+        links = []
+        for item in infolist:
+            if self._is_excluded(item.filename):
+                continue
+
+            path = os.path.normpath(os.path.join(root, item.filename.lstrip('/')))
+            if path != root and not path.startswith(os.path.join(root, '')):
+                return dict(cmd=None, rc=1, out='', err='Refusing to unpack %s outside of %s' % (item.filename, self.dest))
+
+            ftype, special, perm = self._zipinfo_type(item)
+            if not special:
+                perm = perm & ~umask
+            timestamp = self._zipinfo_timestamp(item)
+            if ftype == 'd':
+                directories.append((path, perm, timestamp))
+                parents.add(path)
+            elif ftype == 'L':
+                links.append((item, path, ftype, perm, timestamp))
+                parents.add(os.path.dirname(path))
+            else:
+                members.append((item, path, ftype, perm, timestamp))
+                parents.add(os.path.dirname(path))
+
+        for path in sorted(parents):
+            if not os.path.isdir(path):
+                try:
+                    os.makedirs(path)
+                except OSError:
+                    e = get_exception()
+                    return dict(cmd=None, rc=1, out='', err='%s: %s' % (path, e))
+
+        errors = []
+        members.reverse()
+        workers = max(1, min(self.module.params['workers'], len(members)))
+        if workers == 1:
+            self._extract_members(members, errors)
+        else:
+            threads = []
+            for i in range(workers):
+                thread = threading.Thread(target=self._extract_members, args=(members, errors))
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+        links.reverse()
+        self._extract_members(links, errors)
+
+        # Directory modes and times last, unpacking into them changes their mtime
+        directories.sort(key=lambda d: d[0].count(os.sep), reverse=True)
+        for path, perm, timestamp in directories:
+            try:
+                os.chmod(path, perm)
+                os.utime(path, (timestamp, timestamp))
+            except OSError:
+                e = get_exception()
+                errors.append('%s: %s' % (path, e))
+
+        return dict(cmd=None, rc=int(bool(errors)), out='', err='\n'.join(errors))
+
+    def _extract_members(self, members, errors):
+        ''' Worker, unpack members until there are none left '''
+        archive = ZipFile(self.src)
+        try:
+            while True:
+                try:
+                    item, path, ftype, perm, timestamp = members.pop()
+                except IndexError:
+                    break
+                try:
+                    self._extract_member(archive, item, path, ftype, perm, timestamp)
+                except Exception:
+                    e = get_exception()
+                    errors.append('%s: %s' % (path, e))
+        finally:
+            archive.close()
+
+    def _extract_member(self, archive, item, path, ftype, perm, timestamp):
+        # Replace what is in the way, never write through an existing link
+        if os.path.islink(path) or (os.path.exists(path) and not os.path.isdir(path)):
+            os.unlink(path)
+
+        if ftype == 'L':
+            os.symlink(to_native(archive.read(item), errors='surrogate_or_strict'), path)
+            return
+
+        source = archive.open(item)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_NOFOLLOW', 0), perm)
+            preallocate(fd, item.file_size)
+            f = os.fdopen(fd, 'wb')
+            try:
+                data = source.read(BUFSIZE)
+                while data:
+                    f.write(data)
+                    data = source.read(BUFSIZE)
+            finally:
+                f.close()
+        finally:
+            source.close()
+        os.chmod(path, perm)
+        os.utime(path, (timestamp, timestamp))
+
     def unarchive(self):
+        if not self.opts:
+            results = self._native_unarchive()
+            if results is not None:
+                return results
+
         cmd = [ self.cmd_path, '-o', self.src ]
         if self.opts:
             cmd.extend(self.opts)
@@ -566,7 +889,14 @@ class ZipArchive(object):
 
     def can_handle_archive(self):
         if not self.cmd_path:
-            return False, 'Command "unzip" not found.'
+            # python's zipfile does without unzip, but cannot honour its options
+            if self.opts or not hasattr(ZipFile, 'open'):
+                return False, 'Command "unzip" not found.'
+            try:
+                ZipFile(self.src).close()
+            except (BadZipfile, IOError):
+                return False, 'Command "unzip" not found and python zipfile cannot read the archive.'
+            return True, None
         cmd = [ self.cmd_path, '-l', self.src ]
         rc, out, err = self.module.run_command(cmd)
         if rc == 0:
@@ -634,7 +964,135 @@ class TgzArchive(object):
                 self._files_in_archive.append(to_native(filename))
         return self._files_in_archive
 
+    def _is_excluded(self, name):
+        ''' Match like tar's --exclude, a pattern may match any sequence of path components '''
+        if not self.excludes:
+            return False
+        parts = name.rstrip('/').split('/')
+        for i in range(len(parts)):
+            for j in range(i + 1, len(parts) + 1):
+                subpath = '/'.join(parts[i:j])
+                for pattern in self.excludes:
+                    if fnmatch.fnmatch(subpath, pattern):
+                        return True
+        return False
+
+    def _native_diff(self):
+        '''
+        Compare the member headers of the archive against dest, reporting
+        differences the way 'tar --diff' does. The archive is read once and the
+        files in dest are never read, only stat'ed. Returns None when python's
+        tarfile cannot read the archive.
+        '''
+        try:
+            archive = tarfile.open(self.src, 'r:*')
+        except (tarfile.TarError, IOError, OSError):
+            return None
+
+        index = DestIndex(self.dest)
+        run_uid = os.getuid()
+        # tar only applies the umask when not extracting as root
+        if run_uid == 0:
+            umask = 0
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+        uids = {}
+        gids = {}
+        out = ''
+        try:
+            try:
+                for member in archive:
+                    name = member.name.lstrip('/')
+                    if not name or self._is_excluded(name):
+                        continue
+
+                    try:
+                        st = index.lstat(name)
+                    except OSError:
+                        out += '%s: Warning: Cannot stat: No such file or directory\n' % name
+                        continue
+
+                    if member.isdir():
+                        same_type = stat.S_ISDIR(st.st_mode)
+                    elif member.issym():
+                        same_type = stat.S_ISLNK(st.st_mode)
+                    elif member.isreg() or member.islnk():
+                        same_type = stat.S_ISREG(st.st_mode)
+                    elif member.ischr():
+                        same_type = stat.S_ISCHR(st.st_mode)
+                    elif member.isblk():
+                        same_type = stat.S_ISBLK(st.st_mode)
+                    elif member.isfifo():
+                        same_type = stat.S_ISFIFO(st.st_mode)
+                    else:
+                        same_type = True
+                    if not same_type:
+                        out += '%s: File type differs\n' % name
+                        continue
+
+                    # hard links are only checked for existence
+                    if member.islnk():
+                        continue
+
+                    # tar maps owner names to local ids when they exist
+                    if run_uid == 0 and not self.file_args['owner']:
+                        if member.uname not in uids:
+                            try:
+                                uids[member.uname] = pwd.getpwnam(member.uname).pw_uid
+                            except (KeyError, TypeError):
+                                uids[member.uname] = None
+                        uid = uids[member.uname]
+                        if uid is None:
+                            uid = member.uid
+                        if uid != st.st_uid:
+                            out += '%s: Uid differs\n' % name
+
+                    if run_uid == 0 and not self.file_args['group']:
+                        if member.gname not in gids:
+                            try:
+                                gids[member.gname] = grp.getgrnam(member.gname).gr_gid
+                            except (KeyError, TypeError):
+                                gids[member.gname] = None
+                        gid = gids[member.gname]
+                        if gid is None:
+                            gid = member.gid
+                        if gid != st.st_gid:
+                            out += '%s: Gid differs\n' % name
+
+                    if member.issym():
+                        if os.readlink(os.path.join(self.dest, name)) != member.linkname:
+                            out += '%s: Symlink differs\n' % name
+                        continue
+
+                    if not self.file_args['mode'] and (member.mode & ~umask & int('07777', 8)) != (st.st_mode & int('07777', 8)):
+                        out += '%s: Mode differs\n' % name
+
+                    if member.isreg():
+                        if int(member.mtime) != int(st.st_mtime):
+                            # files newer than the archive are left alone with keep_newer
+                            if not (self.module.params['keep_newer'] and st.st_mtime > member.mtime):
+                                out += '%s: Mod time differs\n' % name
+                        if member.size != st.st_size:
+                            out += '%s: Size differs\n' % name
+            except (tarfile.TarError, IOError, OSError, EOFError):
+                return None
+        finally:
+            archive.close()
+
+        if out:
+            rc = 1
+        else:
+            rc = 0
+        return dict(unarchived=not out, rc=rc, out=out, err='', cmd=None)
+
     def is_unarchived(self):
+        # transformations in extra_opts (--strip-components, --transform, ...) can only be applied by tar itself
+        if not self.opts:
+            result = self._native_diff()
+            if result is not None:
+                return result
+
         cmd = [ self.cmd_path, '--diff', '-C', self.dest ]
         if self.zipflag:
             cmd.append(self.zipflag)
@@ -738,6 +1196,82 @@ class TarXzArchive(TgzArchive):
         self.zipflag = '-J'
 
 
+def read_manifest(path):
+    ''' Load a manifest written by write_manifest(), None if there is no usable one '''
+    try:
+        f = open(path)
+        try:
+            manifest = json.load(f)
+        finally:
+            f.close()
+    except (IOError, ValueError):
+        return None
+    if not isinstance(manifest, dict):
+        return None
+    return manifest
+
+
+def manifest_matches(manifest, checksum, params, dest):
+    '''
+    True when the archive and options are the ones recorded in the manifest and
+    every recorded path still has the same metadata. Only stat calls are made.
+    '''
+    if manifest is None or manifest.get('checksum') != checksum or manifest.get('params') != params:
+        return False
+
+    index = DestIndex(dest)
+    try:
+        for path, size, mtime, mode, uid, gid, crc in manifest['members']:
+            try:
+                st = index.lstat(path)
+            except OSError:
+                return False
+            if st.st_mode != mode or st.st_uid != uid or st.st_gid != gid:
+                return False
+            # the size and mtime of a directory change with what is in it
+            if not stat.S_ISDIR(st.st_mode) and (st.st_size != size or st.st_mtime != mtime):
+                return False
+    except (KeyError, TypeError, ValueError):
+        return False
+
+    return True
+
+
+def write_manifest(path, checksum, params, handler, dest):
+    ''' Record the metadata of every unpacked path, returns False if some are missing '''
+    members = []
+    for filename in handler.files_in_archive:
+        try:
+            st = os.lstat(os.path.join(dest, filename))
+        except OSError:
+            return False
+
+        crc = None
+        if isinstance(handler, ZipArchive):
+            try:
+                crc = handler._crc32(filename)
+            except (KeyError, UnarchiveError):
+                pass
+        members.append([filename, st.st_size, st.st_mtime, st.st_mode, st.st_uid, st.st_gid, crc])
+
+    manifest = dict(checksum=checksum, params=params, handler=handler.__class__.__name__, members=members)
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=dest)
+        f = os.fdopen(fd, 'w')
+        try:
+            json.dump(manifest, f)
+        finally:
+            f.close()
+        os.rename(tmp, path)
+    except (IOError, OSError):
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+        return False
+
+    return True
+
+
 # try handlers in order and return the one that works or bail if none work
 def pick_handler(src, dest, file_args, module):
     handlers = [ZipArchive, TgzArchive, TarArchive, TarBzipArchive, TarXzArchive]
@@ -767,6 +1301,8 @@ def main():
             exclude           = dict(required=False, default=[], type='list'),
             extra_opts        = dict(required=False, default=[], type='list'),
             validate_certs    = dict(required=False, default=True, type='bool'),
+            manifest          = dict(required=False, default=False, type='bool'),
+            workers           = dict(required=False, default=1, type='int'),
         ),
         add_file_common_args = True,
         mutually_exclusive   = [("copy", "remote_src"),],
@@ -823,6 +1359,20 @@ def main():
     if not os.path.isdir(dest):
         module.fail_json(msg="Destination '%s' is not a directory" % dest)
 
+    # an unchanged archive unpacked with the same options needs no inspection
+    manifest_path = None
+    if module.params['manifest']:
+        archive_name = module.params['original_basename'] or os.path.basename(src)
+        manifest_path = os.path.join(dest, MANIFEST_NAME % archive_name)
+        archive_checksum = module.sha1(src)
+        manifest_params = dict([(k, module.params[k]) for k in MANIFEST_PARAMS])
+        manifest = read_manifest(manifest_path)
+        if manifest_matches(manifest, archive_checksum, manifest_params, dest):
+            res_args = dict(handler=manifest.get('handler'), dest=dest, src=src, changed=False)
+            if module.params['list_files']:
+                res_args['files'] = [member[0] for member in manifest['members']]
+            module.exit_json(**res_args)
+
     handler = pick_handler(src, dest, file_args, module)
 
     res_args = dict(handler=handler.__class__.__name__, dest=dest, src=src)
@@ -866,6 +1416,9 @@ def main():
     if module.params['list_files']:
         res_args['files'] = handler.files_in_archive
 
+    if manifest_path and not module.check_mode:
+        write_manifest(manifest_path, archive_checksum, manifest_params, handler, dest)
+
     module.exit_json(**res_args)
 
 # import module snippets
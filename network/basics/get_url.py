@@ -23,7 +23,15 @@
 import shutil
 import datetime
 import re
+import stat
 import tempfile
+import threading
+import time
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
 
 DOCUMENTATION = '''
 ---
@@ -156,6 +164,48 @@ options:
     required: false
     choices: [ "yes", "no" ]
     default: "no"
+  segments:
+    description:
+      - Number of parallel connections to download an HTTP(S) URL with. The file is split in
+        ranges of at least 1MB requested with HTTP range requests, if the server supports them
+        and announces the size of the file. Otherwise a single connection is used.
+    required: false
+    default: 1
+    version_added: '2.3'
+  resume:
+    description:
+      - Keep an interrupted HTTP(S) download in C(tmp_dest), or C(~/.ansible/tmp) if it is not set,
+        under a name derived from C(url), and only request the missing ranges on the next run. A download is only resumed if the
+        server supports range requests and the ETag or Last-Modified of the file did not change.
+    required: false
+    choices: [ "yes", "no" ]
+    default: "no"
+    version_added: '2.3'
+  cache_dir:
+    description:
+      - Directory of an on-host cache of downloaded files. Files are stored once per content and
+        found again by the expected C(checksum), without any request, or by C(url), revalidated
+        with a conditional request using the ETag and Last-Modified they were served with.
+      - On a hit, C(dest) is made a copy of the cached file sharing its extents (reflink) where
+        the filesystem supports it, or a plain copy otherwise.
+      - The cache should only be writable by the user running the module.
+    required: false
+    default: null
+    version_added: '2.3'
+  cache_size:
+    description:
+      - Maximum size of C(cache_dir) in megabytes, least recently used files are evicted first.
+    required: false
+    default: 1024
+    version_added: '2.3'
+  cache_hardlink:
+    description:
+      - On a cache hit, hardlink C(dest) to the cached file instead of copying it. C(dest) then
+        shares its permissions and ownership with the cache, and must not be modified in place.
+    required: false
+    choices: [ "yes", "no" ]
+    default: "no"
+    version_added: '2.3'
   others:
     description:
       - all arguments accepted by the M(file) module also work here
@@ -198,6 +248,21 @@ EXAMPLES='''
     dest: /etc/foo.conf
     checksum: md5:66dffb5228a211e61d6d7ef4a86f5758
 
+- name: download a large file over 4 connections, resuming if interrupted
+  get_url:
+    url: http://example.com/path/image.qcow2
+    dest: /var/lib/libvirt/images/image.qcow2
+    checksum: sha256:b5bb9d8014a0f9b1d61e21e796d78dccdf1352f23cd32812f4850b878ae4944c
+    segments: 4
+    resume: yes
+
+- name: download an artifact through the host cache, shared by all releases
+  get_url:
+    url: http://example.com/path/app-1.2.3.tar.gz
+    dest: /opt/app/releases/1.2.3/app.tar.gz
+    checksum: sha256:b5bb9d8014a0f9b1d61e21e796d78dccdf1352f23cd32812f4850b878ae4944c
+    cache_dir: /var/cache/ansible/get_url
+
 - name: download file from a file path
   get_url: 
     url: "file:///tmp/afile.txt" 
@@ -206,6 +271,18 @@ EXAMPLES='''
 
 from ansible.module_utils.six.moves.urllib.parse import urlsplit
 
+# bytes read from a response at a time
+BUFSIZE = 64 * 1024
+# smallest range worth its own connection
+MIN_SEGMENT_SIZE = 1024 * 1024
+# ioctl sharing the extents of one file with another (reflink), linux/fs.h
+FICLONE = 0x40049409
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 # ==============================================================
 # url handling
 
@@ -215,21 +292,369 @@ def url_filename(url):
         return 'index.html'
     return fn
 
-def url_get(module, url, dest, use_proxy, last_mod_time, force, timeout=10, headers=None, tmp_dest=''):
-    """
-    Download data from the url and store in a temporary file.
+class DownloadCache(object):
+    '''
+    On-host cache of downloaded files. Each content is stored once, under its
+    sha1, and found by the url it was downloaded from (along with the ETag
+    and Last-Modified to revalidate it) or by the checksums tasks expected of
+    it. The least recently used files are evicted once the cache holds more
+    than max_size bytes.
+    '''
 
-    Return (tempfile, info about the request)
-    """
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self.index = dict(objects={}, urls={}, checksums={})
+        try:
+            f = open(os.path.join(path, 'index.json'))
+            try:
+                index = json.load(f)
+            finally:
+                f.close()
+            if isinstance(index, dict):
+                self.index.update(index)
+        except (IOError, ValueError):
+            pass
 
-    rsp, info = fetch_url(module, url, use_proxy=use_proxy, force=force, last_mod_time=last_mod_time, timeout=timeout, headers=headers)
+    def object_path(self, sha1):
+        return os.path.join(self.path, sha1)
 
-    if info['status'] == 304:
-        module.exit_json(url=url, dest=dest, changed=False, msg=info.get('msg', ''))
+    def _found(self, sha1):
+        if sha1 not in self.index['objects'] or not os.path.exists(self.object_path(sha1)):
+            return False
+        self.index['objects'][sha1][1] = time.time()
+        return True
 
-    # create a temporary file and copy content to do checksum-based replacement
-    if info['status'] != 200 and not url.startswith('file:/') and not (url.startswith('ftp:/') and info.get('msg', '').startswith('OK')):
-        module.fail_json(msg="Request failed", status_code=info['status'], response=info['msg'], url=url, dest=dest)
+    def by_checksum(self, algorithm, checksum):
+        sha1 = self.index['checksums'].get('%s:%s' % (algorithm, checksum))
+        if sha1 is None or not self._found(sha1):
+            return None
+        return dict(sha1=sha1)
+
+    def by_url(self, url):
+        entry = self.index['urls'].get(url)
+        if entry is None or not self._found(entry['sha1']):
+            return None
+        return entry
+
+    def store(self, tmpsrc, sha1, url, info, filename, checksum_key=None):
+        ''' Add a downloaded file, linked to its temporary file when possible '''
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, int('0700', 8))
+        path = self.object_path(sha1)
+        if not os.path.exists(path):
+            try:
+                os.link(tmpsrc, path)
+            except OSError:
+                fd, tmp = tempfile.mkstemp(dir=self.path)
+                os.close(fd)
+                shutil.copyfile(tmpsrc, tmp)
+                os.rename(tmp, path)
+        self.index['objects'][sha1] = [os.path.getsize(path), time.time()]
+        self.index['urls'][url] = dict(sha1=sha1, etag=info.get('etag'),
+                                       last_modified=info.get('last-modified'), filename=filename)
+        if checksum_key:
+            self.index['checksums'][checksum_key] = sha1
+        self.evict()
+
+    def evict(self):
+        objects = self.index['objects']
+        total = sum([entry[0] for entry in objects.values()])
+        for sha1 in sorted(objects, key=lambda k: objects[k][1]):
+            if total <= self.max_size:
+                break
+            total -= objects.pop(sha1)[0]
+            if os.path.exists(self.object_path(sha1)):
+                os.remove(self.object_path(sha1))
+            for url, entry in list(self.index['urls'].items()):
+                if entry['sha1'] == sha1:
+                    del self.index['urls'][url]
+            for key, value in list(self.index['checksums'].items()):
+                if value == sha1:
+                    del self.index['checksums'][key]
+
+    def save(self):
+        ''' Best effort, a lost index only costs downloads '''
+        tmp = None
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path, int('0700', 8))
+            fd, tmp = tempfile.mkstemp(dir=self.path)
+            f = os.fdopen(fd, 'w')
+            try:
+                json.dump(self.index, f)
+            finally:
+                f.close()
+            os.rename(tmp, os.path.join(self.path, 'index.json'))
+        except (IOError, OSError):
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+def link_from_cache(path, dest, hardlink=False):
+    '''
+    Atomically replace dest with the cached file at path: a hardlink if asked
+    and possible, else a copy sharing its extents (reflink) where supported,
+    with the permissions dest had.
+    '''
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest))
+    os.close(fd)
+    try:
+        linked = False
+        if hardlink:
+            os.remove(tmp)
+            try:
+                os.link(path, tmp)
+                linked = True
+            except OSError:
+                open(tmp, 'wb').close()
+        if not linked:
+            src = open(path, 'rb')
+            try:
+                dst = open(tmp, 'wb')
+                try:
+                    cloned = False
+                    if fcntl is not None:
+                        try:
+                            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                            cloned = True
+                        except (IOError, OSError):
+                            pass
+                    if not cloned:
+                        shutil.copyfileobj(src, dst, BUFSIZE)
+                finally:
+                    dst.close()
+            finally:
+                src.close()
+            if os.path.exists(dest):
+                shutil.copymode(dest, tmp)
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmp, int('0666', 8) & ~umask)
+        os.rename(tmp, dest)
+    except (IOError, OSError):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def install_from_cache(module, cache, entry, url, dest, dest_is_dir, backup, algorithm, checksum):
+    ''' Put a cached file in place of dest, and exit like main() does after a download '''
+    if dest_is_dir:
+        dest = os.path.join(dest, entry.get('filename') or url_filename(url))
+    cached = cache.object_path(entry['sha1'])
+
+    if checksum != '':
+        cached_checksum = module.digest_from_file(cached, algorithm)
+        if checksum != cached_checksum:
+            module.fail_json(msg="The checksum for %s did not match %s; it was %s." % (dest, checksum, cached_checksum))
+        cache.index['checksums']['%s:%s' % (algorithm, checksum)] = entry['sha1']
+
+    checksum_dest = None
+    if os.path.exists(dest):
+        if not os.access(dest, os.W_OK):
+            module.fail_json( msg="Destination %s not writable" % (dest))
+        if not os.access(dest, os.R_OK):
+            module.fail_json( msg="Destination %s not readable" % (dest))
+        checksum_dest = module.sha1(dest)
+    elif not os.access(os.path.dirname(dest), os.W_OK):
+        module.fail_json( msg="Destination %s not writable" % (os.path.dirname(dest)))
+
+    backup_file = None
+    changed = checksum_dest != entry['sha1']
+    if changed:
+        try:
+            if backup and os.path.exists(dest):
+                backup_file = module.backup_local(dest)
+            link_from_cache(cached, dest, module.params['cache_hardlink'])
+        except (IOError, OSError):
+            err = get_exception()
+            module.fail_json(msg="failed to copy %s to %s: %s" % (cached, dest, str(err)))
+    cache.save()
+
+    # allow file attribute changes
+    module.params['path'] = dest
+    file_args = module.load_file_common_arguments(module.params)
+    file_args['path'] = dest
+    changed = module.set_fs_attributes_if_different(file_args, changed)
+
+    # Backwards compat only.  We'll return None on FIPS enabled systems
+    try:
+        md5sum = module.md5(dest)
+    except ValueError:
+        md5sum = None
+
+    res_args = dict(
+        url = url, dest = dest, src = cached, md5sum = md5sum, checksum_src = entry['sha1'],
+        checksum_dest = checksum_dest, changed = changed, msg = 'found in cache', cache_hit = True
+    )
+    if backup_file:
+        res_args['backup_file'] = backup_file
+    module.exit_json(**res_args)
+
+def split_segments(size, count):
+    ''' Split size bytes in at most count [start, end, done] ranges, end excluded '''
+    if size is None or count < 2 or size < 2 * MIN_SEGMENT_SIZE:
+        return [[0, size, 0]]
+    count = min(count, size // MIN_SEGMENT_SIZE)
+    step = size // count
+    segments = []
+    for i in range(count):
+        end = (i + 1) * step
+        if i == count - 1:
+            end = size
+        segments.append([i * step, end, 0])
+    return segments
+
+def partial_path(tmp_dir, url):
+    '''
+    Name of the partial download of url kept for resume=yes. Without tmp_dir
+    it goes to a directory only the user can write to, a predictable name in
+    a shared one could be replaced by someone else.
+    '''
+    if not tmp_dir:
+        tmp_dir = os.path.expanduser('~/.ansible/tmp')
+        if not os.path.isdir(tmp_dir):
+            os.makedirs(tmp_dir, int('0700', 8))
+    h = AVAILABLE_HASH_ALGORITHMS['sha1']()
+    h.update(to_bytes(url, errors='surrogate_or_strict'))
+    return os.path.join(tmp_dir, '.get_url-%s.part' % h.hexdigest())
+
+def open_private(path, mode='r+b', create=False):
+    '''
+    Open path without following a symlink, and only if it is a regular file
+    owned by the user that nobody else can write to. With create, a new file
+    is made in its place.
+    '''
+    flags = getattr(os, 'O_NOFOLLOW', 0)
+    if 'r' in mode and '+' not in mode:
+        flags |= os.O_RDONLY
+    elif 'r' in mode:
+        flags |= os.O_RDWR
+    else:
+        flags |= os.O_WRONLY
+    if create:
+        if os.path.lexists(path):
+            os.unlink(path)
+        flags |= os.O_CREAT | os.O_EXCL
+    fd = os.open(path, flags, int('0600', 8))
+    st = os.fstat(fd)
+    if not stat.S_ISREG(st.st_mode) or st.st_uid != os.geteuid() or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        os.close(fd)
+        raise IOError('%s is not a private file of the current user' % path)
+    return os.fdopen(fd, mode)
+
+def load_state(tempname, url):
+    ''' What is known of a partial download, None if it cannot be resumed '''
+    try:
+        open_private(tempname, 'rb').close()
+        f = open_private(tempname + '.state', 'r')
+        try:
+            state = json.load(f)
+        finally:
+            f.close()
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get('url') != url or not state.get('validator'):
+        return None
+    return state
+
+def save_state(tempname, state):
+    try:
+        f = open_private(tempname + '.state', 'w', create=True)
+        try:
+            json.dump(state, f)
+        finally:
+            f.close()
+    except (IOError, OSError):
+        pass
+
+def remove_state(tempname):
+    if os.path.lexists(tempname + '.state'):
+        os.remove(tempname + '.state')
+
+def range_header(segment):
+    if segment[1] is None:
+        return 'bytes=%d-' % (segment[0] + segment[2])
+    return 'bytes=%d-%d' % (segment[0] + segment[2], segment[1] - 1)
+
+def stream_segment(rsp, tempname, segment, hashes=None):
+    '''
+    Write what rsp returns at the current position of segment in tempname,
+    feeding it to hashes if any, until the segment is complete.
+    '''
+    f = open_private(tempname, 'r+b')
+    try:
+        f.seek(segment[0] + segment[2])
+        while segment[1] is None or segment[0] + segment[2] < segment[1]:
+            size = BUFSIZE
+            if segment[1] is not None:
+                size = min(size, segment[1] - segment[0] - segment[2])
+            data = rsp.read(size)
+            if not data:
+                break
+            f.write(data)
+            if hashes:
+                for h in hashes.values():
+                    h.update(data)
+            segment[2] += len(data)
+    finally:
+        f.close()
+    if segment[1] is not None and segment[0] + segment[2] < segment[1]:
+        raise IOError('connection closed after %d of %d bytes' % (segment[2], segment[1] - segment[0]))
+
+def hash_segment(hashes, tempname, start, end):
+    ''' Feed a range of what was already written to hashes '''
+    f = open_private(tempname, 'rb')
+    try:
+        f.seek(start)
+        while start < end:
+            data = f.read(min(BUFSIZE, end - start))
+            if not data:
+                break
+            for h in hashes.values():
+                h.update(data)
+            start += len(data)
+    finally:
+        f.close()
+
+def fetch_segment(module, url, tempname, segment, validator, use_proxy, force, timeout, headers, errors):
+    '''
+    Thread body, download one range of the file. This uses open_url rather
+    than fetch_url, which would call fail_json from the thread.
+    '''
+    try:
+        req_headers = dict(headers or {})
+        req_headers['Range'] = range_header(segment)
+        if validator:
+            req_headers['If-Range'] = validator
+        rsp = open_url(url, headers=req_headers, use_proxy=use_proxy, force=force, timeout=timeout,
+                       validate_certs=module.params['validate_certs'],
+                       url_username=module.params.get('url_username', ''),
+                       url_password=module.params.get('url_password', ''),
+                       http_agent=module.params.get('http_agent', None),
+                       force_basic_auth=module.params.get('force_basic_auth', ''))
+        if rsp.code != 206:
+            rsp.close()
+            raise IOError('range request for %s failed: %s' % (req_headers['Range'], rsp.code))
+        try:
+            stream_segment(rsp, tempname, segment)
+        finally:
+            rsp.close()
+    except Exception:
+        errors.append(str(get_exception()))
+
+def url_get(module, url, dest, use_proxy, last_mod_time, force, timeout=10, headers=None, tmp_dest='',
+            segments=1, resume=False, algorithms=(), not_modified=False):
+    """
+    Download data from the url and store in a temporary file. HTTP(S) downloads
+    can be split in ranges fetched in parallel and resume a partial download.
+    The content is hashed as it arrives, ranges fetched by other connections
+    are hashed in order as soon as they are complete.
+
+    Return (tempfile, info about the request, hex digests of the content).
+    With not_modified, a 304 response returns (None, info, None) instead of
+    exiting.
+    """
 
     if tmp_dest != '':
         # tmp_dest should be an existing dir
@@ -240,20 +665,122 @@ def url_get(module, url, dest, use_proxy, last_mod_time, force, timeout=10, head
             else:
                 module.fail_json(msg="%s directory does not exist." % tmp_dest)
 
-        fd, tempname = tempfile.mkstemp(dir=tmp_dest)
-    else:
-        fd, tempname = tempfile.mkstemp()
+    is_http = urlsplit(url)[0] in ('http', 'https')
+    resume = resume and is_http
+
+    state = None
+    req_headers = dict(headers or {})
+    if resume:
+        try:
+            tempname = partial_path(tmp_dest, url)
+        except OSError:
+            e = get_exception()
+            module.fail_json(msg="failed to create the directory for partial downloads: %s" % str(e))
+        state = load_state(tempname, url)
+        if state:
+            pending = [seg for seg in state['segments'] if seg[1] is None or seg[0] + seg[2] < seg[1]]
+            if pending:
+                req_headers['Range'] = range_header(pending[0])
+                req_headers['If-Range'] = state['validator']
+            else:
+                state = None
+
+    rsp, info = fetch_url(module, url, use_proxy=use_proxy, force=force, last_mod_time=last_mod_time, timeout=timeout, headers=req_headers)
+
+    if info['status'] == 304:
+        if not_modified:
+            return None, info, None
+        module.exit_json(url=url, dest=dest, changed=False, msg=info.get('msg', ''))
+
+    if state and info['status'] != 206:
+        # the file changed on the server or ranges are not supported, start over
+        state = None
+
+    # create a temporary file and copy content to do checksum-based replacement
+    if info['status'] not in (200, 206) and not url.startswith('file:/') and not (url.startswith('ftp:/') and info.get('msg', '').startswith('OK')):
+        module.fail_json(msg="Request failed", status_code=info['status'], response=info['msg'], url=url, dest=dest)
+
+    if state is None:
+        size = None
+        try:
+            size = int(info['content-length'])
+        except (KeyError, TypeError, ValueError):
+            pass
+        if is_http and info.get('accept-ranges', '').lower() == 'bytes':
+            segment_list = split_segments(size, segments)
+        else:
+            segment_list = [[0, size, 0]]
+        state = dict(url=url, validator=info.get('etag') or info.get('last-modified'), size=size, segments=segment_list)
+
+        if resume:
+            try:
+                f = open_private(tempname, 'wb', create=True)
+            except (IOError, OSError):
+                e = get_exception()
+                module.fail_json(msg="failed to create partial download %s: %s" % (tempname, str(e)))
+        elif tmp_dest != '':
+            fd, tempname = tempfile.mkstemp(dir=tmp_dest)
+            f = os.fdopen(fd, 'wb')
+        else:
+            fd, tempname = tempfile.mkstemp()
+            f = os.fdopen(fd, 'wb')
+        f.close()
+        if resume and state['validator']:
+            save_state(tempname, state)
+
+    hashes = {}
+    for algorithm in algorithms:
+        try:
+            hashes[algorithm] = AVAILABLE_HASH_ALGORITHMS[algorithm]()
+        except (KeyError, ValueError):
+            pass
+
+    # the range the first response answers, the others go to worker threads
+    segment_list = state['segments']
+    pending = [seg for seg in segment_list if seg[1] is None or seg[0] + seg[2] < seg[1]]
+    first = pending[0]
+    errors = []
+    threads = []
+    for segment in pending[1:]:
+        thread = threading.Thread(target=fetch_segment, args=(module, url, tempname, segment, state['validator'],
+                                                              use_proxy, force, timeout, headers, errors))
+        thread.start()
+        threads.append((segment, thread))
 
-    f = os.fdopen(fd, 'wb')
     try:
-        shutil.copyfileobj(rsp, f)
+        try:
+            # everything up to the current position of the first range is on disk already
+            hash_segment(hashes, tempname, 0, first[0] + first[2])
+            stream_segment(rsp, tempname, first, hashes)
+        finally:
+            rsp.close()
     except Exception:
-        err = get_exception()
-        os.remove(tempname)
-        module.fail_json(msg="failed to create temporary content file: %s" % str(err))
-    f.close()
-    rsp.close()
-    return tempname, info
+        errors.append(str(get_exception()))
+
+    # ranges are hashed in order, each as soon as it is complete
+    hashed = first[1]
+    for segment, thread in threads:
+        thread.join()
+        if not errors:
+            hash_segment(hashes, tempname, hashed, segment[1])
+            hashed = segment[1]
+    if not errors and state['size'] is not None and hashed is not None and hashed < state['size']:
+        hash_segment(hashes, tempname, hashed, state['size'])
+
+    if errors:
+        if resume and state['validator']:
+            save_state(tempname, state)
+        else:
+            os.remove(tempname)
+        module.fail_json(msg="failed to create temporary content file: %s" % '; '.join(errors))
+
+    if resume:
+        remove_state(tempname)
+
+    digests = dict([(algorithm, None) for algorithm in algorithms])
+    for algorithm, h in hashes.items():
+        digests[algorithm] = h.hexdigest()
+    return tempname, info, digests
 
 def extract_filename_from_headers(headers):
     """
@@ -289,6 +816,11 @@ def main():
         timeout = dict(required=False, type='int', default=10),
         headers = dict(required=False, default=None),
         tmp_dest = dict(required=False, default=''),
+        segments = dict(required=False, type='int', default=1),
+        resume = dict(required=False, type='bool', default=False),
+        cache_dir = dict(required=False, type='path', default=None),
+        cache_size = dict(required=False, type='int', default=1024),
+        cache_hardlink = dict(required=False, type='bool', default=False),
     )
 
     module = AnsibleModule(
@@ -306,6 +838,11 @@ def main():
     use_proxy = module.params['use_proxy']
     timeout = module.params['timeout']
     tmp_dest = os.path.expanduser(module.params['tmp_dest'])
+    segments = module.params['segments']
+    resume = module.params['resume']
+
+    if segments < 1:
+        module.fail_json(msg="segments must be at least 1")
 
     # Parse headers to dict
     if module.params['headers']:
@@ -318,6 +855,7 @@ def main():
 
     dest_is_dir = os.path.isdir(dest)
     last_mod_time = None
+    algorithm = None
 
     # workaround for usage of deprecated sha256sum parameter
     if sha256sum != '':
@@ -370,12 +908,43 @@ def main():
         if checksum_mismatch:
             force = True
 
-    # download to tmpsrc
-    tmpsrc, info = url_get(module, url, dest, use_proxy, last_mod_time, force, timeout, headers, tmp_dest)
+    # download to tmpsrc, hashing it on the way
+    algorithms = ['sha1', 'md5']
+    if checksum != '':
+        if algorithm not in AVAILABLE_HASH_ALGORITHMS:
+            module.fail_json(msg="Could not hash file with algorithm '%s'. Available algorithms: %s" %
+                             (algorithm, ', '.join(AVAILABLE_HASH_ALGORITHMS)))
+        algorithms.append(algorithm)
+
+    cache = None
+    cached = None
+    if module.params['cache_dir']:
+        cache = DownloadCache(module.params['cache_dir'], module.params['cache_size'] * 1024 * 1024)
+        if checksum != '':
+            # the expected content is known, no need to ask the server
+            entry = cache.by_checksum(algorithm, checksum)
+            if entry is not None:
+                install_from_cache(module, cache, entry, url, dest, dest_is_dir, backup, algorithm, checksum)
+        if not module.params['force']:
+            cached = cache.by_url(url)
+        if cached is not None:
+            # revalidate the cached file rather than dest
+            headers = dict(headers or {})
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+            last_mod_time = None
+
+    tmpsrc, info, digests = url_get(module, url, dest, use_proxy, last_mod_time, force, timeout, headers, tmp_dest,
+                                    segments, resume, algorithms, cached is not None)
+    if tmpsrc is None:
+        install_from_cache(module, cache, cached, url, dest, dest_is_dir, backup, algorithm, checksum)
 
     # Now the request has completed, we can finally generate the final
     # destination file name from the info dict.
 
+    filename = None
     if dest_is_dir:
         filename = extract_filename_from_headers(info)
         if not filename:
@@ -395,7 +964,12 @@ def main():
     if not os.access(tmpsrc, os.R_OK):
         os.remove(tmpsrc)
         module.fail_json( msg="Source %s not readable" % (tmpsrc))
-    checksum_src = module.sha1(tmpsrc)
+    checksum_src = digests['sha1']
+
+    # verify the download before it replaces anything
+    if checksum != '' and checksum != digests[algorithm]:
+        os.remove(tmpsrc)
+        module.fail_json(msg="The checksum for %s did not match %s; it was %s." % (dest, checksum, digests[algorithm]))
 
     # check if there is no dest file
     if os.path.exists(dest):
@@ -427,12 +1001,16 @@ def main():
     else:
         changed = False
 
-    if checksum != '':
-        destination_checksum = module.digest_from_file(dest, algorithm)
-
-        if checksum != destination_checksum:
-            os.remove(dest)
-            module.fail_json(msg="The checksum for %s did not match %s; it was %s." % (dest, checksum, destination_checksum))
+    if cache is not None:
+        checksum_key = None
+        if checksum != '':
+            checksum_key = '%s:%s' % (algorithm, checksum)
+        try:
+            cache.store(tmpsrc, checksum_src, url, info, filename, checksum_key)
+            cache.save()
+        except (IOError, OSError):
+            # the cache is best effort, dest is in place already
+            pass
 
     os.remove(tmpsrc)
 
@@ -443,10 +1021,7 @@ def main():
     changed = module.set_fs_attributes_if_different(file_args, changed)
 
     # Backwards compat only.  We'll return None on FIPS enabled systems
-    try:
-        md5sum = module.md5(dest)
-    except ValueError:
-        md5sum = None
+    md5sum = digests['md5']
 
     res_args = dict(
         url = url, dest = dest, src = tmpsrc, md5sum = md5sum, checksum_src = checksum_src,
@@ -34,8 +34,30 @@ options:
     required: true
     default: null
     aliases: []
+  offset:
+    description:
+      - Byte offset in the file to start reading at.
+    required: false
+    default: 0
+    version_added: "2.3"
+  length:
+    description:
+      - Number of bytes to read from C(offset). Reads to the end of the file if not set.
+      - Together with C(offset), this allows paging through a large file in several calls.
+    required: false
+    default: null
+    version_added: "2.3"
+  compression:
+    description:
+      - Compress the data before encoding it. C(zlib) and C(gzip) output are decompressed
+        with python's C(zlib) or C(gzip) respectively.
+    required: false
+    default: none
+    choices: [ "none", "zlib", "gzip" ]
+    version_added: "2.3"
 notes:
-   -  This module returns an 'in memory' base64 encoded version of the file, take into account that this will require at least twice the RAM as the original file size.
+   -  This module returns an 'in memory' base64 encoded version of the file, take into account that this will require at least twice the RAM as the size of what is returned.
+      The file is read, compressed and encoded a block at a time, use C(offset) and C(length) to bound the size of what is returned.
    - "See also: M(fetch)"
 requirements: []
 author: 
@@ -49,27 +71,142 @@ ansible host -m slurp -a 'src=/tmp/xx'
       "content": "aGVsbG8gQW5zaWJsZSB3b3JsZAo=", 
       "encoding": "base64"
    }
+
+# Fetch the second MB of a large log, gzip compressed
+- slurp:
+    src: /var/log/messages
+    offset: 1048576
+    length: 1048576
+    compression: gzip
+'''
+
+RETURN = '''
+content:
+    description: base64 encoded data read from the file, compressed if requested
+    returned: success
+    type: string
+    sample: "aGVsbG8gQW5zaWJsZSB3b3JsZAo="
+encoding:
+    description: encoding of content
+    returned: success
+    type: string
+    sample: "base64"
+source:
+    description: the file read
+    returned: success
+    type: string
+    sample: "/tmp/xx"
+offset:
+    description: byte offset the data was read from
+    returned: success
+    type: int
+    sample: 0
+length:
+    description: number of bytes read from the file, before compression
+    returned: success
+    type: int
+    sample: 20
+size:
+    description: size of the file
+    returned: success
+    type: int
+    sample: 20
+eof:
+    description: whether the data read reaches the end of the file
+    returned: success
+    type: bool
+    sample: true
+compression:
+    description: compression applied before encoding
+    returned: success
+    type: string
+    sample: "none"
 '''
 
 import base64
+import zlib
+
+# bytes read at a time, a multiple of 3 so blocks encode without padding
+BLOCK_SIZE = 3 * 21846
+
+def compressor(compression):
+    ''' Return a zlib compressobj writing the requested format, or None '''
+    if compression == 'zlib':
+        return zlib.compressobj()
+    if compression == 'gzip':
+        # wbits 16 + MAX_WBITS produces a gzip header and trailer
+        return zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return None
+
+def encode_range(path, offset=0, length=None, compression=None):
+    '''
+    Read length bytes of path from offset (to the end of the file if length is
+    None), compress them if asked and return them base64 encoded, along with
+    the number of bytes read. Only the encoded output is held whole, input is
+    read, compressed and encoded a block at a time.
+    '''
+    compress = compressor(compression)
+    encoded = []
+    read = 0
+    f = open(path, 'rb')
+    try:
+        pending = f.read(0)
+        f.seek(offset)
+        while length is None or read < length:
+            size = BLOCK_SIZE
+            if length is not None:
+                size = min(size, length - read)
+            data = f.read(size)
+            if not data:
+                break
+            read += len(data)
+            if compress is not None:
+                data = compress.compress(data)
+            if pending:
+                data = pending + data
+            # keep what does not fill a base64 quantum for the next block
+            cut = len(data) - len(data) % 3
+            pending = data[cut:]
+            if cut:
+                encoded.append(base64.b64encode(data[:cut]))
+    finally:
+        f.close()
+
+    if compress is not None:
+        pending += compress.flush()
+    if pending or not encoded:
+        encoded.append(base64.b64encode(pending))
+    return encoded[0][:0].join(encoded), read
 
 def main():
     module = AnsibleModule(
         argument_spec = dict(
             src = dict(required=True, aliases=['path'], type='path'),
+            offset = dict(default=0, type='int'),
+            length = dict(default=None, type='int'),
+            compression = dict(default='none', choices=['none', 'zlib', 'gzip']),
         ),
         supports_check_mode=True
     )
     source = module.params['src']
+    offset = module.params['offset']
+    length = module.params['length']
+    compression = module.params['compression']
 
     if not os.path.exists(source):
         module.fail_json(msg="file not found: %s" % source)
     if not os.access(source, os.R_OK):
         module.fail_json(msg="file is not readable: %s" % source)
+    if offset < 0:
+        module.fail_json(msg="offset must not be negative: %d" % offset)
+    if length is not None and length < 0:
+        module.fail_json(msg="length must not be negative: %d" % length)
 
-    data = base64.b64encode(open(source, 'rb').read())
+    size = os.path.getsize(source)
+    data, read = encode_range(source, offset, length, compression)
 
-    module.exit_json(content=data, source=source, encoding='base64')
+    module.exit_json(content=data, source=source, encoding='base64', offset=offset, length=read,
+                     size=size, eof=offset + read >= size, compression=compression)
 
 # import module snippets
 from ansible.module_utils.basic import *
@@ -32,7 +32,8 @@ options:
   url:
     description:
       - HTTP or HTTPS URL in the form (http|https)://host.domain[:port]/path
-    required: true
+      - Required unless I(requests) is given.
+    required: false
     default: null
   dest:
     description:
@@ -147,6 +148,28 @@ options:
     default: 'yes'
     choices: ['yes', 'no']
     version_added: '1.9.2'
+  requests:
+    description:
+      - A list of requests to make in one task instead of the single I(url). Each item is a hash
+        with a C(url) and optionally C(method), C(body), C(body_format), C(headers), C(status_code)
+        and C(return_content), which default to the values of the task.
+      - Requests to the same scheme, host and port reuse a keep-alive connection, so a batch
+        pays for one TCP and TLS handshake per host and worker.
+      - Credentials, if given, are sent with Basic authentication, upfront with I(force_basic_auth)
+        or else when the server answers 401. They are not sent to another scheme or host after a
+        redirect. Requests going through a proxy are made one by one without connection reuse.
+      - Each result in C(results) has the status, headers, elapsed time in seconds and, if
+        requested, the content of its request. The task fails if any request fails.
+      - Mutually exclusive with I(url) and I(dest).
+    required: false
+    default: null
+    version_added: '2.3'
+  workers:
+    description:
+      - Number of I(requests) made concurrently, each worker holding its own connections.
+    required: false
+    default: 1
+    version_added: '2.3'
 notes:
   - The dependency on httplib2 was removed in Ansible 2.1
 author: "Romeo Theriault (@romeotheriault)"
@@ -206,13 +229,43 @@ EXAMPLES = '''
     force_basic_auth: yes
     status_code: 201
 
+- name: Check the health of all backends over pooled connections
+  uri:
+    requests:
+      - url: http://backend1.example.com:8080/health
+      - url: http://backend2.example.com:8080/health
+      - url: http://backend3.example.com:8080/health
+    workers: 2
+  register: health
+
+- name: Seed the API with a few items
+  uri:
+    requests:
+      - url: https://api.example.com/items
+        method: POST
+        body: {name: first}
+      - url: https://api.example.com/items
+        method: POST
+        body: {name: second}
+    body_format: json
+    status_code: 201
 '''
 
+import base64
 import cgi
 import datetime
 import os
 import shutil
+import socket
 import tempfile
+import threading
+import time
+
+try:
+    import ssl
+    HAS_SSL = True
+except ImportError:
+    HAS_SSL = False
 
 try:
     import json
@@ -222,7 +275,7 @@ except ImportError:
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.pycompat24 import get_exception
 import ansible.module_utils.six as six
-from ansible.module_utils._text import to_text
+from ansible.module_utils._text import to_bytes, to_text
 from ansible.module_utils.urls import fetch_url, url_argument_spec
 
 
@@ -354,6 +407,247 @@ def uri(module, url, dest, body, body_format, method, headers, socket_timeout):
     return r, content, dest
 
 
+def format_response(url, resp, content):
+    """Returns the response as module results, and its content decoded
+    from the charset it was served with.
+    """
+
+    # Transmogrify the headers, replacing '-' with '_', since variables dont
+    # work with dashes.
+    # In python3, the headers are title cased.  Lowercase them to be
+    # compatible with the python2 behaviour.
+    uresp = {}
+    for key, value in six.iteritems(resp):
+        ukey = key.replace("-", "_").lower()
+        uresp[ukey] = value
+
+    try:
+        uresp['location'] = absolute_location(url, uresp['location'])
+    except KeyError:
+        pass
+
+    # Default content_encoding to try
+    content_encoding = 'utf-8'
+    if 'content_type' in uresp:
+        content_type, params = cgi.parse_header(uresp['content_type'])
+        if 'charset' in params:
+            content_encoding = params['charset']
+        u_content = to_text(content, encoding=content_encoding)
+        if 'application/json' in content_type or 'text/json' in content_type:
+            try:
+                js = json.loads(u_content)
+                uresp['json'] = js
+            except:
+                pass
+    else:
+        u_content = to_text(content, encoding=content_encoding)
+
+    return uresp, u_content
+
+
+def follows_redirect(follow_redirects, method, status):
+    # the same policy fetch_url applies to redirects
+    if follow_redirects in ('all', 'yes'):
+        return True
+    if follow_redirects == 'safe':
+        return method in ('GET', 'HEAD')
+    if follow_redirects == 'urllib2':
+        # what urllib2's HTTPRedirectHandler does, POST is redirected as a GET
+        return method in ('GET', 'HEAD') or (method == 'POST' and status != 307)
+    return False
+
+
+def needs_proxy(url):
+    parts = six.moves.urllib.parse.urlsplit(url)
+    proxies = six.moves.urllib.request.getproxies()
+    return parts[0] in proxies and not six.moves.urllib.request.proxy_bypass(parts[1])
+
+
+class ConnectionPool(object):
+    """Keep-alive connections of one worker, one per scheme, host and port,
+    following redirects the way fetch_url does. The auth header is only sent
+    to the scheme and host of the requested url, upfront with force_auth or
+    else in answer to a 401.
+    """
+
+    MAX_REDIRECTS = 10
+
+    def __init__(self, module, timeout, ssl_context=None, auth=None, force_auth=False):
+        self.module = module
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.auth = auth
+        self.force_auth = force_auth
+        self.connections = {}
+
+    def connect(self, scheme, netloc):
+        if scheme == 'https':
+            if self.ssl_context is None:
+                return six.moves.http_client.HTTPSConnection(netloc, timeout=self.timeout)
+            return six.moves.http_client.HTTPSConnection(netloc, timeout=self.timeout,
+                                                         context=self.ssl_context)
+        return six.moves.http_client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def send(self, method, url, body, headers):
+        parts = six.moves.urllib.parse.urlsplit(url)
+        key = (parts[0], parts[1])
+        path = parts[2] or '/'
+        if parts[3]:
+            path = '%s?%s' % (path, parts[3])
+
+        for attempt in (1, 2):
+            conn = self.connections.pop(key, None)
+            reused = conn is not None
+            if conn is None:
+                conn = self.connect(*key)
+            try:
+                conn.request(method, path, body, headers)
+                resp = conn.getresponse()
+                content = resp.read()
+            except (six.moves.http_client.HTTPException, socket.error):
+                conn.close()
+                if reused:
+                    # the server closed the idle connection, retry on a new one
+                    continue
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self.connections[key] = conn
+            return resp, content
+
+    def request(self, method, url, body, headers):
+        """Returns the same info and content fetch_url and uri() do"""
+        info = dict(url=url)
+        redirected = False
+        origin = six.moves.urllib.parse.urlsplit(url)[:2]
+        auth = self.auth
+        if [k for k in headers if k.lower() == 'authorization']:
+            auth = None
+        try:
+            for hop in range(self.MAX_REDIRECTS + 1):
+                same_origin = six.moves.urllib.parse.urlsplit(url)[:2] == origin
+                req_headers = headers
+                if auth and self.force_auth and same_origin:
+                    req_headers = dict(headers, Authorization=auth)
+                resp, content = self.send(method, url, body, req_headers)
+                if resp.status == 401 and auth and not self.force_auth and same_origin \
+                        and resp.getheader('www-authenticate', '').lower().startswith('basic'):
+                    req_headers = dict(headers, Authorization=auth)
+                    resp, content = self.send(method, url, body, req_headers)
+                info = dict([(k.lower(), v) for k, v in resp.getheaders()])
+                info.update(url=url, status=resp.status, msg='OK (%s bytes)' % len(content))
+                if resp.status not in (301, 302, 303, 307) or 'location' not in info \
+                        or not follows_redirect(self.module.params['follow_redirects'], method, resp.status):
+                    break
+                url = absolute_location(url, info['location'])
+                redirected = True
+                if resp.status != 307 and method not in ('GET', 'HEAD'):
+                    method = 'GET'
+                    body = None
+            if resp.status >= 400:
+                info['msg'] = 'HTTP Error %s: %s' % (resp.status, resp.reason)
+        except (six.moves.http_client.HTTPException, socket.error):
+            e = get_exception()
+            info.update(status=-1, msg='Request failed: %s' % str(e))
+            content = ''
+        info['redirected'] = redirected
+        return info, content
+
+    def close(self):
+        for conn in self.connections.values():
+            conn.close()
+        self.connections = {}
+
+
+def batch_ssl_context(module, urls):
+    """SSL context for the HTTPS connections of a batch, None when there are
+    none or when this python cannot take one.
+    """
+
+    if not [url for url in urls if url.lower().startswith('https:')]:
+        return None
+    if not HAS_SSL:
+        module.fail_json(msg='requests to HTTPS urls need the python ssl module')
+    if not module.params['validate_certs']:
+        if hasattr(ssl, '_create_unverified_context'):
+            return ssl._create_unverified_context()
+        # older pythons do not validate certificates at all
+        return None
+    if not hasattr(ssl, 'create_default_context'):
+        module.fail_json(msg='validating certificates of requests needs python 2.7.9 or later,'
+                             ' set validate_certs=no to skip it')
+    return ssl.create_default_context()
+
+
+def uri_batch(module, batch, headers, socket_timeout, workers):
+    """Makes the requests of a batch, requests through a proxy one by one
+    with fetch_url, the others over the keep-alive connections of each
+    worker. Returns one (info, content, elapsed) per request, in order.
+    """
+
+    auth = None
+    if module.params['url_username'] is not None:
+        credentials = '%s:%s' % (module.params['url_username'], module.params['url_password'] or '')
+        auth = 'Basic %s' % to_text(base64.b64encode(to_bytes(credentials)))
+    if module.params['http_agent']:
+        headers['User-agent'] = module.params['http_agent']
+
+    results = [None] * len(batch)
+    pending = []
+    proxied = []
+    for index, req in enumerate(batch):
+        req_headers = dict(headers)
+        req_headers.update(req['headers'])
+        req = (index, req['method'], req['url'], req['body'], req_headers)
+        if module.params['use_proxy'] and needs_proxy(req[2]):
+            proxied.append(req)
+        else:
+            pending.append(req)
+    pending.reverse()
+
+    ssl_context = batch_ssl_context(module, [req[2] for req in pending])
+    errors = []
+
+    def work():
+        pool = ConnectionPool(module, socket_timeout, ssl_context, auth, module.params['force_basic_auth'])
+        try:
+            while True:
+                try:
+                    index, method, url, body, req_headers = pending.pop()
+                except IndexError:
+                    break
+                start = time.time()
+                info, content = pool.request(method, url, body, req_headers)
+                results[index] = (info, content, time.time() - start)
+        finally:
+            pool.close()
+
+    def run():
+        try:
+            work()
+        except Exception:
+            errors.append(get_exception())
+
+    threads = []
+    for i in range(min(workers, len(pending)) - 1):
+        t = threading.Thread(target=run)
+        t.start()
+        threads.append(t)
+    run()
+    for t in threads:
+        t.join()
+    if errors:
+        module.fail_json(msg='Request failed: %s' % str(errors[0]))
+
+    for index, method, url, body, req_headers in proxied:
+        start = time.time()
+        info, content, dest = uri(module, url, None, body, None, method, req_headers, socket_timeout)
+        results[index] = (info, content, time.time() - start)
+
+    return results
+
+
 def main():
     argument_spec = url_argument_spec()
     argument_spec.update(dict(
@@ -369,13 +663,17 @@ def main():
         removes = dict(required=False, default=None, type='path'),
         status_code = dict(required=False, default=[200], type='list'),
         timeout = dict(required=False, default=30, type='int'),
-        headers = dict(required=False, type='dict', default={})
+        headers = dict(required=False, type='dict', default={}),
+        requests = dict(required=False, default=None, type='list'),
+        workers = dict(required=False, default=1, type='int'),
     ))
 
     module = AnsibleModule(
         argument_spec=argument_spec,
         check_invalid_arguments=False,
-        add_file_common_args=True
+        add_file_common_args=True,
+        required_one_of=[['url', 'requests']],
+        mutually_exclusive=[['url', 'requests'], ['dest', 'requests']],
     )
 
     url  = module.params['url']
@@ -393,10 +691,42 @@ def main():
 
     if body_format == 'json':
         # Encode the body unless its a string, then assume it is pre-formatted JSON
-        if not isinstance(body, basestring):
+        if not isinstance(body, six.string_types):
             body = json.dumps(body)
         dict_headers['Content-Type'] = 'application/json'
 
+    batch = None
+    if module.params['requests'] is not None:
+        if module.params['workers'] < 1:
+            module.fail_json(msg="workers must be at least 1")
+        batch = []
+        for req in module.params['requests']:
+            if not isinstance(req, dict) or 'url' not in req:
+                module.fail_json(msg="each item of requests must be a hash with a url, got %s" % str(req))
+            req = dict(req)
+            req.setdefault('method', method)
+            req['method'] = req['method'].upper()
+            req.setdefault('body', module.params['body'])
+            req.setdefault('return_content', return_content)
+            req['headers'] = dict(req.get('headers') or {})
+            # same forms as the status_code option: a list, a comma separated string or a number
+            codes = req.get('status_code', status_code)
+            if isinstance(codes, six.string_types):
+                codes = codes.split(',')
+            elif not isinstance(codes, list):
+                codes = [codes]
+            try:
+                req['status_code'] = [int(x) for x in codes]
+            except (TypeError, ValueError):
+                module.fail_json(msg="status_code of a request must be a list of integers, got %s" % str(req['status_code']))
+            if req.get('body_format', body_format).lower() == 'json':
+                if req['body'] is not None and not isinstance(req['body'], six.string_types):
+                    req['body'] = json.dumps(req['body'])
+                req['headers']['Content-Type'] = 'application/json'
+            if req['body'] is not None:
+                req['body'] = to_bytes(req['body'])
+            batch.append(req)
+
     # Grab all the http headers. Need this hack since passing multi-values is
     # currently a bit ugly. (e.g. headers='{"Content-Type":"application/json"}')
     for key, value in six.iteritems(module.params):
@@ -419,6 +749,29 @@ def main():
         if not os.path.exists(removes):
             module.exit_json(stdout="skipped, since %s does not exist" % removes, changed=False, stderr=False, rc=0)
 
+    if batch is not None:
+        start = time.time()
+        responses = uri_batch(module, batch, dict_headers, socket_timeout, module.params['workers'])
+        results = []
+        failed = 0
+        for req, (resp, content, elapsed) in zip(batch, responses):
+            resp['status'] = int(resp['status'])
+            uresp, u_content = format_response(req['url'], resp, content)
+            uresp['method'] = req['method']
+            uresp['elapsed'] = elapsed
+            if req['return_content']:
+                uresp['content'] = u_content
+            if resp['status'] not in req['status_code']:
+                uresp['failed'] = True
+                uresp['msg'] = 'Status code was not %s: %s' % (req['status_code'], uresp.get('msg', ''))
+                failed += 1
+            results.append(uresp)
+        elapsed = time.time() - start
+        if failed:
+            module.fail_json(msg='%d of %d requests failed' % (failed, len(results)),
+                             results=results, elapsed=elapsed)
+        module.exit_json(changed=False, results=results, elapsed=elapsed)
+
     # Make the request
     resp, content, dest = uri(module, url, dest, body, body_format, method,
                               dict_headers, socket_timeout)
@@ -440,35 +793,7 @@ def main():
     else:
         changed = False
 
-    # Transmogrify the headers, replacing '-' with '_', since variables dont
-    # work with dashes.
-    # In python3, the headers are title cased.  Lowercase them to be
-    # compatible with the python2 behaviour.
-    uresp = {}
-    for key, value in six.iteritems(resp):
-        ukey = key.replace("-", "_").lower()
-        uresp[ukey] = value
-
-    try:
-        uresp['location'] = absolute_location(url, uresp['location'])
-    except KeyError:
-        pass
-
-    # Default content_encoding to try
-    content_encoding = 'utf-8'
-    if 'content_type' in uresp:
-        content_type, params = cgi.parse_header(uresp['content_type'])
-        if 'charset' in params:
-            content_encoding = params['charset']
-        u_content = to_text(content, encoding=content_encoding)
-        if 'application/json' in content_type or 'text/json' in content_type:
-            try:
-                js = json.loads(u_content)
-                uresp['json'] = js
-            except:
-                pass
-    else:
-        u_content = to_text(content, encoding=content_encoding)
+    uresp, u_content = format_response(url, resp, content)
 
     if resp['status'] not in status_code:
         uresp['msg'] = 'Status code was not %s: %s' % (status_code, uresp.get('msg', ''))
@@ -136,6 +136,9 @@ notes:
      the virtualenv needs to be created.
    - By default, this module will use the appropriate version of pip for the
      interpreter used by ansible (e.g. pip3 when using python 3, pip2 otherwise)
+   - With C(state=present) or C(state=absent) and no I(extra_args), the names given are
+     first looked up in the installed packages, by their normalized (PEP 503) names, and
+     pip only runs, once, for those that need installing or removing.
 requirements: [ "virtualenv", "pip" ]
 author: "Matt Wright (@mattupstate)"
 '''
@@ -227,6 +230,9 @@ from ansible.module_utils.six import PY3
 _SPECIAL_PACKAGE_CHECKERS = {'setuptools': 'import setuptools; print(setuptools.__version__)',
                              'pip': 'import pkg_resources; print(pkg_resources.get_distribution("pip").version)'}
 
+_CANONICALIZE_RE = re.compile(r'[-_.]+')
+_REQUIREMENT_RE = re.compile(r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:==\s*([^\s,;]+))?\s*$')
+
 
 def _get_cmd_options(module, cmd):
     thiscmd = cmd + " --help"
@@ -264,29 +270,44 @@ def _get_packages(module, pip, chdir):
     return (command, out, err)
 
 
-def _is_present(name, version, installed_pkgs, pkg_command):
-    '''Return whether or not package is installed.'''
-    for pkg in installed_pkgs:
+def _canonicalize_name(name):
+    '''Return the PEP 503 normalized form of a project name.'''
+    return _CANONICALIZE_RE.sub('-', name).lower()
+
+
+def _parse_requirement(pkg, version=None):
+    '''Return (name, version) for a plain "name" or "name==version"
+    requirement, None for anything only pip can resolve (other specifiers,
+    extras, urls, paths).'''
+    match = _REQUIREMENT_RE.match(pkg)
+    if match is None:
+        return None
+    return match.group(1), match.group(2) or version
+
+
+def _get_package_index(pkg_list, pkg_command):
+    '''Return a dict of the installed packages, normalized name to version.'''
+    index = {}
+    for pkg in pkg_list:
         # Package listing will be different depending on which pip
         # command was used ('pip list' vs. 'pip freeze').
-        if 'list' in pkg_command:
-            pkg = pkg.replace('(', '').replace(')', '')
-            if ',' in pkg:
-                pkg_name, pkg_version, _ = pkg.replace(',', '').split(' ')
-            else:
-                pkg_name, pkg_version = pkg.split(' ')
-        elif 'freeze' in pkg_command:
-            if '==' in pkg:
-                pkg_name, pkg_version = pkg.split('==')
-            else:
+        if pkg_command.endswith(' list'):
+            fields = pkg.replace('(', ' ').replace(')', ' ').replace(',', ' ').split()
+            if len(fields) < 2 or fields[0] == 'Package' or fields[0].startswith('-'):
                 continue
+            pkg_name, pkg_version = fields[:2]
+        elif '==' in pkg:
+            pkg_name, pkg_version = pkg.split('==', 1)
         else:
             continue
+        index[_canonicalize_name(pkg_name.strip())] = pkg_version.strip()
+    return index
 
-        if pkg_name == name and (version is None or version == pkg_version):
-            return True
 
-    return False
+def _is_present(name, version, installed):
+    '''Return whether or not package is installed.'''
+    pkg_version = installed.get(_canonicalize_name(name))
+    return pkg_version is not None and (version is None or version == pkg_version)
 
 
 def _get_pip(module, env=None, executable=None):
@@ -376,6 +397,26 @@ def _get_package_info(module, package, env=None):
     return formatted_dep
 
 
+def _get_installed(module, pip, chdir, env, names):
+    '''Run pip once and return its command, output and the index of the
+    installed packages.'''
+    pkg_cmd, out, err = _get_packages(module, pip, chdir)
+    pkg_list = [p for p in out.split('\n') if not p.startswith('You are using') and not p.startswith('You should consider') and p]
+
+    if pkg_cmd.endswith(' freeze'):
+        # Older versions of pip (pre-1.3) do not have pip list.
+        # pip freeze does not list setuptools or pip in its output
+        # So we need to get those via a specialcase
+        for pkg in ('setuptools', 'pip'):
+            if pkg in names:
+                formatted_dep = _get_package_info(module, pkg, env)
+                if formatted_dep is not None:
+                    pkg_list.append(formatted_dep)
+                    out += '%s\n' % formatted_dep
+
+    return pkg_cmd, out, err, _get_package_index(pkg_list, pkg_cmd)
+
+
 def main():
     state_map = dict(
         present='install',
@@ -507,46 +548,44 @@ def main():
         if extra_args:
             cmd += ' %s' % extra_args
 
+        if module.check_mode and (extra_args or requirements or state not in ('present', 'absent') or not name or has_vcs):
+            module.exit_json(changed=True)
+
+        # Resolve the requested names against one listing of the installed
+        # packages, so that pip only runs, once, for the ones that need it
+        pending = name
+        if name and state in ('present', 'absent') and not extra_args:
+            requested = [(pkg, _parse_requirement(pkg, version)) for pkg in name]
+            pkg_cmd, out_pip, err_pip, installed = _get_installed(
+                module, pip, chdir, env, [req[0] for pkg, req in requested if req])
+
+            pending = []
+            for pkg, req in requested:
+                if req is None:
+                    pending.append(pkg)
+                elif state == 'present' and not _is_present(req[0], req[1], installed):
+                    pending.append(pkg)
+                elif state == 'absent' and _is_present(req[0], None, installed):
+                    # pip uninstalls whatever version is installed
+                    pending.append(pkg)
+
+            if module.check_mode:
+                out += out_pip
+                err += err_pip
+                module.exit_json(changed=bool(pending), cmd=pkg_cmd, stdout=out, stderr=err)
+
+            if not pending:
+                module.exit_json(changed=False, cmd=pkg_cmd, name=name, version=version,
+                                 state=state, requirements=requirements, virtualenv=env,
+                                 stdout=out, stderr=err)
+
         if name:
-            for pkg in name:
+            for pkg in pending:
                 cmd += ' %s' % _get_full_name(pkg, version)
         else:
             if requirements:
                 cmd += ' -r %s' % requirements
 
-        if module.check_mode:
-            if extra_args or requirements or state == 'latest' or not name:
-                module.exit_json(changed=True)
-            elif has_vcs:
-                module.exit_json(changed=True)
-
-            pkg_cmd, out_pip, err_pip = _get_packages(module, pip, chdir)
-
-            out += out_pip
-            err += err_pip
-
-            changed = False
-            if name:
-                pkg_list = [p for p in out.split('\n') if not p.startswith('You are using') and not p.startswith('You should consider') and p]
-
-                if pkg_cmd.endswith(' freeze') and ('pip' in name or 'setuptools' in name):
-                    # Older versions of pip (pre-1.3) do not have pip list.
-                    # pip freeze does not list setuptools or pip in its output
-                    # So we need to get those via a specialcase
-                    for pkg in ('setuptools', 'pip'):
-                        if pkg in name:
-                            formatted_dep = _get_package_info(module, pkg, env)
-                            if formatted_dep is not None:
-                                pkg_list.append(formatted_dep)
-                                out += '%s\n' % formatted_dep
-
-                for pkg in name:
-                    is_present = _is_present(pkg, version, pkg_list, pkg_cmd)
-                    if (state == 'present' and not is_present) or (state == 'absent' and is_present):
-                        changed = True
-                        break
-            module.exit_json(changed=changed, cmd=pkg_cmd, stdout=out, stderr=err)
-
         if requirements or has_vcs:
             _, out_freeze_before, _ = _get_packages(module, pip, chdir)
         else:
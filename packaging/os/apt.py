@@ -124,6 +124,8 @@ author: "Matthew Williams (@mgwilliams)"
 notes:
    - Three of the upgrade modes (C(full), C(safe) and its alias C(yes)) require C(aptitude), otherwise
      C(apt-get) suffices.
+   - When all the packages named already are in the requested state, and the cache needs no update, this is
+     found from the dpkg status file alone, without loading the apt cache.
 '''
 
 EXAMPLES = '''
@@ -220,6 +222,7 @@ stderr:
 import warnings
 warnings.filterwarnings('ignore', "apt API not stable yet", FutureWarning)
 
+import bisect
 import datetime
 import fnmatch
 import itertools
@@ -230,6 +233,7 @@ import time
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.pycompat24 import get_exception
+from ansible.module_utils.six import b
 from ansible.module_utils._text import to_native
 from ansible.module_utils.urls import fetch_url
 
@@ -250,6 +254,7 @@ APT_GET_ZERO = "\n0 upgraded, 0 newly installed"
 APTITUDE_ZERO = "\n0 packages upgraded, 0 newly installed"
 APT_LISTS_PATH = "/var/lib/apt/lists"
 APT_UPDATE_SUCCESS_STAMP_PATH = "/var/lib/apt/periodic/update-success-stamp"
+DPKG_STATUS_PATH = "/var/lib/dpkg/status"
 
 HAS_PYTHON_APT = True
 try:
@@ -265,6 +270,63 @@ else:
     PYTHON_APT = 'python3-apt'
 
 
+# the index of the apt cache in use, see package_index()
+_package_index = []
+
+
+class PackageIndex(object):
+    """Lookups in one apt cache, kept for the whole run.
+
+    Packages looked up by package_status() are kept, and the sorted package
+    names are listed once, on the first glob, so that each glob is only
+    matched against the names sharing its literal prefix.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        # changes whenever the cache is reopened
+        self.ll_cache = cache._cache
+        self.packages = {}
+        self._names = None
+        self._native = None
+
+    def lookup(self, pkgname):
+        """Return the package and its low-level apt_pkg.Package, raise
+        KeyError when the cache has no such package."""
+        if pkgname not in self.packages:
+            try:
+                self.packages[pkgname] = (self.cache[pkgname], self.cache._cache[pkgname])
+            except KeyError:
+                self.packages[pkgname] = None
+        if self.packages[pkgname] is None:
+            raise KeyError(pkgname)
+        return self.packages[pkgname]
+
+    def match(self, pattern):
+        """Return the package names matching a glob, only native ones unless
+        the glob names an architecture."""
+        if self._names is None:
+            self._names = sorted([pkg.name for pkg in self.cache])
+            self._native = [name for name in self._names if ':' not in name]
+        if ':' in pattern:
+            names = self._names
+        else:
+            names = self._native
+
+        prefix = re.split(r'[*?\[\]!]', pattern, 1)[0]
+        end = start = bisect.bisect_left(names, prefix)
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return fnmatch.filter(names[start:end], pattern)
+
+
+def package_index(cache):
+    if not _package_index or _package_index[0].cache is not cache \
+            or _package_index[0].ll_cache is not cache._cache:
+        _package_index[:] = [PackageIndex(cache)]
+    return _package_index[0]
+
+
 def package_split(pkgspec):
     parts = pkgspec.split('=', 1)
     if len(parts) > 1:
@@ -299,8 +361,7 @@ def package_status(m, pkgname, version, cache, state):
         # low-level apt_pkg.Package object which contains
         # state fields not directly accessible from the
         # higher-level apt.package.Package object.
-        pkg = cache[pkgname]
-        ll_pkg = cache._cache[pkgname] # the low-level package object
+        pkg, ll_pkg = package_index(cache).lookup(pkgname)
     except KeyError:
         if state == 'install':
             try:
@@ -370,6 +431,68 @@ def package_status(m, pkgname, version, cache, state):
     return package_is_installed, package_is_upgradable, has_files
 
 
+def read_dpkg_status(path=DPKG_STATUS_PATH):
+    """Return the packages of the dpkg status file, each name mapped to a
+    list of (architecture, state, version), state being the last word of
+    its Status field."""
+    packages = {}
+    fields = {}
+    # read as bytes, other fields (Maintainer, Description) need not be in the locale encoding
+    f = open(path, 'rb')
+    try:
+        for line in itertools.chain(f, [b('')]):
+            if not line.strip():
+                if 'Package' in fields and 'Status' in fields:
+                    packages.setdefault(fields['Package'], []).append(
+                        (fields.get('Architecture'), fields['Status'].split()[-1], fields.get('Version')))
+                fields = {}
+            elif line[:1] not in (b(' '), b('\t')) and b(':') in line:
+                key, value = line.split(b(':'), 1)
+                key = to_native(key, errors='surrogate_or_strict')
+                if key in ('Package', 'Status', 'Architecture', 'Version'):
+                    fields[key] = to_native(value.strip(), errors='surrogate_or_strict')
+    finally:
+        f.close()
+    return packages
+
+
+def dpkg_status_satisfies(m, pkgspec, state, purge=False):
+    """Tell from the dpkg status file alone whether all the packages already
+    are in the requested state. False when they are not, or when only apt
+    can tell (globs, virtual packages, half installed packages)."""
+    try:
+        packages = read_dpkg_status()
+    except IOError:
+        return False
+
+    native_arch = None
+    for package in pkgspec:
+        name, version = package_split(package)
+        if package.count('=') > 1 or frozenset('*?[]!').intersection(name):
+            return False
+        if ':' in name:
+            name, arch = name.split(':', 1)
+            arches = (arch,)
+        else:
+            if native_arch is None:
+                rc, out, err = m.run_command([m.get_bin_path('dpkg', True), '--print-architecture'])
+                if rc != 0:
+                    return False
+                native_arch = to_native(out).strip()
+            arches = (native_arch, 'all')
+
+        entries = [e for e in packages.get(name, []) if e[0] in arches]
+        if [e for e in entries if e[1] not in ('installed', 'not-installed', 'config-files')]:
+            return False
+        installed = [e for e in entries if e[1] == 'installed' and (version is None or fnmatch.fnmatch(e[2], version))]
+        if state == 'present':
+            if not installed:
+                return False
+        elif installed or (purge and [e for e in entries if e[1] == 'config-files']):
+            return False
+    return True
+
+
 def expand_dpkg_options(dpkg_options_compressed):
     options_list = dpkg_options_compressed.split(',')
     dpkg_options = ""
@@ -396,20 +519,7 @@ def expand_pkgspec_from_fnmatches(m, pkgspec, cache):
         if frozenset('*?[]!').intersection(pkgname_pattern):
             # handle multiarch pkgnames, the idea is that "apt*" should
             # only select native packages. But "apt*:i386" should still work
-            if ":" not in pkgname_pattern:
-                # Filter the multiarch packages from the cache only once
-                try:
-                    pkg_name_cache = _non_multiarch
-                except NameError:
-                    pkg_name_cache = _non_multiarch = [pkg.name for pkg in cache if ':' not in pkg.name]  # noqa: F841
-            else:
-                # Create a cache of pkg_names including multiarch only once
-                try:
-                    pkg_name_cache = _all_pkg_names
-                except NameError:
-                    pkg_name_cache = _all_pkg_names = [pkg.name for pkg in cache]  # noqa: F841
-
-            matches = fnmatch.filter(pkg_name_cache, pkgname_pattern)
+            matches = package_index(cache).match(pkgname_pattern)
 
             if len(matches) == 0:
                 m.fail_json(msg="No package(s) matching '%s' available" % str(pkgname_pattern))
@@ -541,7 +651,7 @@ def install_deb(m, debs, cache, force, install_recommends, allow_unauthenticated
             pkg_name = get_field_of_deb(m, deb_file, "Package")
             pkg_version = get_field_of_deb(m, deb_file, "Version")
             try:
-                installed_pkg = apt.Cache()[pkg_name]
+                installed_pkg = cache[pkg_name]
                 installed_version = installed_pkg.installed.version
                 if package_version_compare(pkg_version, installed_version) == 0:
                     # Does not need to down-/upgrade, move on to next package
@@ -846,6 +956,17 @@ def main():
     if p['state'] == 'removed':
         p['state'] = 'absent'
 
+    # Packages already in the requested state, with no cache update due,
+    # are found from the dpkg status file without loading the apt cache
+    if p['package'] and not p['deb'] and not p['upgrade'] and p['state'] in ('present', 'absent'):
+        mtimestamp, updated_cache_time = get_updated_cache_time()
+        tdelta = datetime.timedelta(seconds=p['cache_valid_time'])
+        if not p['update_cache'] or mtimestamp + tdelta >= datetime.datetime.now():
+            if dpkg_status_satisfies(module, p['package'], p['state'], p['purge']):
+                if p['state'] == 'present':
+                    module.exit_json(changed=False, cache_updated=False, cache_update_time=updated_cache_time)
+                module.exit_json(changed=False)
+
     # Get the cache object
     cache = get_cache(module)
 
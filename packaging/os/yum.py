@@ -27,6 +27,8 @@ import rpm
 import platform
 import tempfile
 import shutil
+import copy
+import fnmatch
 from distutils.version import LooseVersion
 
 try:
@@ -138,6 +140,8 @@ notes:
     that the other packages come from (such as epel-release) then that package
     needs to be installed in a separate task. This mimics yum's command line
     behaviour.
+  - When given many package names, the module checks which are installed
+    against a single listing of the rpmdb, taken with one C(rpm -qa) call.
   - 'Yum itself has two types of groups.  "Package groups" are specified in the
     rpm itself while "environment groups" are specified in a separate file
     (usually by the distribution).  Unfortunately, this division becomes
@@ -207,6 +211,13 @@ BUFSIZE = 65536
 
 def_qf = "%{name}-%{version}-%{release}.%{arch}"
 rpmbin = None
+# query sessions of this module run, see query_session()
+sessions = {}
+# from this many package specs on, installed packages are looked up in one
+# 'rpm -qa' snapshot, and available packages and updates in one repoquery
+# listing each, rather than queried one by one
+SNAPSHOT_MIN_SPECS = 5
+use_snapshot = False
 
 def yum_base(conf_file=None):
 
@@ -266,20 +277,184 @@ def po_to_nevra(po):
     else:
         return '%s-%s-%s.%s' % (po.name, po.version, po.release, po.arch)
 
+class QuerySession(object):
+    """
+    Package queries of one module run for one set of repos. Through the yum
+    API a single YumBase is set up, and its rpmdb and repo metadata loaded,
+    for all of them. Through repoquery, when there are enough specs to make
+    it pay (see SNAPSHOT_MIN_SPECS), the available packages and the updates
+    are each listed once, in a single call, and looked up in memory.
+    Answers are kept until invalidate(), which is called after every
+    transaction since it changes the rpmdb.
+    """
+
+    # the same ways to name a package yum.packages.parsePackages matches
+    key_formats = ('%(n)s', '%(n)s.%(a)s', '%(n)s-%(v)s', '%(n)s-%(v)s-%(r)s',
+                   '%(n)s-%(v)s-%(r)s.%(a)s', '%(e)s:%(n)s-%(v)s-%(r)s.%(a)s',
+                   '%(n)s-%(e)s:%(v)s-%(r)s.%(a)s')
+
+    def __init__(self, module, repoq, conf_file, en_repos, dis_repos):
+        self.module = module
+        self.repoq = repoq
+        self.conf_file = conf_file
+        self.en_repos = en_repos
+        self.dis_repos = dis_repos
+        self.invalidate()
+
+    def invalidate(self):
+        self.answers = {}
+        self.indexes = {}
+        self._base = None
+        self._updates = None
+        self._snapshot = None
+
+    def base(self):
+        if self._base is None:
+            my = yum_base(self.conf_file)
+            for rid in self.dis_repos:
+                my.repos.disableRepo(rid)
+            for rid in self.en_repos:
+                my.repos.enableRepo(rid)
+            self._base = my
+        return self._base
+
+    def is_update(self, po):
+        if self._updates is None:
+            updates = self.base().doPackageLists(pkgnarrow='updates').updates
+            self._updates = set([ p.pkgtup for p in updates ])
+        return po.pkgtup in self._updates
+
+    def repoquery(self, args):
+        myrepoq = list(self.repoq)
+        myrepoq.extend(['--disablerepo', ','.join(self.dis_repos)])
+        myrepoq.extend(['--enablerepo', ','.join(self.en_repos)])
+
+        cmd = myrepoq + args
+        rc,out,err = self.module.run_command(cmd)
+        if rc != 0:
+            self.module.fail_json(msg='Error from repoquery: %s: %s' % (cmd, err))
+        return [ p for p in out.split('\n') if p.strip() ]
+
+    def lookup(self, narrow, pkgspec):
+        """
+        Return the packages of narrow ('repos' or 'updates') matching a
+        pkgspec, formatted with def_qf, from one repoquery listing of all
+        of them
+        """
+
+        if narrow not in self.indexes:
+            index = {}
+            qf = "%{name}|%{epoch}|%{version}|%{release}|%{arch}"
+            for line in self.repoquery(['--pkgnarrow=%s' % narrow, '--qf', qf, '-a']):
+                try:
+                    n, e, v, r, a = line.split('|')
+                except ValueError:
+                    continue
+                fields = dict(n=n, e=e, v=v, r=r, a=a)
+                nevra = '%s-%s-%s.%s' % (n, v, r, a)
+                for key_format in self.key_formats:
+                    index.setdefault(key_format % fields, set()).add(nevra)
+            self.indexes[narrow] = index
+
+        index = self.indexes[narrow]
+        if set(['*', '?', '[']).intersection(set(pkgspec)):
+            pkgs = set()
+            for key in fnmatch.filter(index.keys(), pkgspec):
+                pkgs.update(index[key])
+            return pkgs
+        return index.get(pkgspec, set())
+
+    def installed(self, pkgspec, is_pkg=False):
+        """
+        Return the installed packages matching pkgspec by name or NEVRA, or
+        unless is_pkg by what they provide, formatted with def_qf, from one
+        'rpm -qa' snapshot of the rpmdb. None for file and versioned
+        requirements, which the snapshot does not answer.
+        """
+
+        if self._snapshot is None:
+            global rpmbin
+            if not rpmbin:
+                rpmbin = self.module.get_bin_path('rpm', required=True)
+
+            names = {}
+            provides = {}
+            qf = '%{name}|%{epoch}|%{version}|%{release}|%{arch}|[%{PROVIDENAME}\t]\n'
+            cmd = [rpmbin, '-qa', '--qf', qf]
+            lang_env = dict(LANG='C', LC_ALL='C', LC_MESSAGES='C')
+            rc, out, err = self.module.run_command(cmd, environ_update=lang_env)
+            if rc != 0:
+                self.module.fail_json(msg='Error from rpm: %s: %s' % (cmd, err))
+            for line in out.replace('(none)', '0').split('\n'):
+                try:
+                    n, e, v, r, a, pkg_provides = line.split('|', 5)
+                except ValueError:
+                    continue
+                fields = dict(n=n, e=e, v=v, r=r, a=a)
+                nevra = '%s-%s-%s.%s' % (n, v, r, a)
+                for key_format in self.key_formats:
+                    names.setdefault(key_format % fields, set()).add(nevra)
+                for provide in pkg_provides.split('\t'):
+                    if provide:
+                        provides.setdefault(provide, set()).add(nevra)
+            self._snapshot = (names, provides)
+
+        names, provides = self._snapshot
+        if set(['*', '?', '[']).intersection(set(pkgspec)):
+            pkgs = set()
+            for key in fnmatch.filter(names.keys(), pkgspec):
+                pkgs.update(names[key])
+        else:
+            pkgs = names.get(pkgspec, set())
+        if pkgs or is_pkg:
+            return pkgs
+        if pkgspec.startswith('/') or set(' <>=').intersection(set(pkgspec)):
+            return None
+        return provides.get(pkgspec, set())
+
+def query_session(module, repoq, conf_file, en_repos=None, dis_repos=None):
+    en_repos = list(en_repos or [])
+    dis_repos = list(dis_repos or [])
+    key = (tuple(repoq or []), conf_file, tuple(en_repos), tuple(dis_repos))
+    if key not in sessions:
+        sessions[key] = QuerySession(module, repoq, conf_file, en_repos, dis_repos)
+    return sessions[key]
+
+def invalidate_queries():
+    for session in sessions.values():
+        session.invalidate()
+
+def memoized(func):
+    """ Answer a question asked before in the same query session from memory """
+
+    def wrapper(module, repoq, pkgspec, conf_file, qf=def_qf, en_repos=None, dis_repos=None, **kwargs):
+        session = query_session(module, repoq, conf_file, en_repos, dis_repos)
+        key = (func.__name__, pkgspec, qf, tuple(sorted(kwargs.items())))
+        if key not in session.answers:
+            session.answers[key] = func(module, repoq, pkgspec, conf_file, qf=qf,
+                                        en_repos=en_repos, dis_repos=dis_repos, **kwargs)
+        return copy.copy(session.answers[key])
+
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+@memoized
 def is_installed(module, repoq, pkgspec, conf_file, qf=def_qf, en_repos=None, dis_repos=None, is_pkg=False):
     if en_repos is None:
         en_repos = []
     if dis_repos is None:
         dis_repos = []
 
+    if use_snapshot and qf == def_qf:
+        pkgs = query_session(module, repoq, conf_file, en_repos, dis_repos).installed(pkgspec, is_pkg)
+        if pkgs is not None:
+            return sorted(pkgs)
+
     if not repoq:
         pkgs = []
         try:
-            my = yum_base(conf_file)
-            for rid in dis_repos:
-                my.repos.disableRepo(rid)
-            for rid in en_repos:
-                my.repos.enableRepo(rid)
+            my = query_session(module, repoq, conf_file, en_repos, dis_repos).base()
 
             e, m, u = my.rpmdb.matchPackageNames([pkgspec])
             pkgs = e + m
@@ -322,6 +497,7 @@ def is_installed(module, repoq, pkgspec, conf_file, qf=def_qf, en_repos=None, di
 
     return []
 
+@memoized
 def is_available(module, repoq, pkgspec, conf_file, qf=def_qf, en_repos=None, dis_repos=None):
     if en_repos is None:
         en_repos = []
@@ -332,11 +508,7 @@ def is_available(module, repoq, pkgspec, conf_file, qf=def_qf, en_repos=None, di
 
         pkgs = []
         try:
-            my = yum_base(conf_file)
-            for rid in dis_repos:
-                my.repos.disableRepo(rid)
-            for rid in en_repos:
-                my.repos.enableRepo(rid)
+            my = query_session(module, repoq, conf_file, en_repos, dis_repos).base()
 
             e,m,u = my.pkgSack.matchPackageNames([pkgspec])
             pkgs = e + m
@@ -348,6 +520,10 @@ def is_available(module, repoq, pkgspec, conf_file, qf=def_qf, en_repos=None, di
             
         return [ po_to_nevra(p) for p in pkgs ]
 
+    elif use_snapshot and qf == def_qf and not pkgspec.startswith('-'):
+        session = query_session(module, repoq, conf_file, en_repos, dis_repos)
+        return list(session.lookup('repos', pkgspec))
+
     else:
         myrepoq = list(repoq)
                  
@@ -366,6 +542,7 @@ def is_available(module, repoq, pkgspec, conf_file, qf=def_qf, en_repos=None, di
 
     return []
 
+@memoized
 def is_update(module, repoq, pkgspec, conf_file, qf=def_qf, en_repos=None, dis_repos=None):
     if en_repos is None:
         en_repos = []
@@ -376,30 +553,28 @@ def is_update(module, repoq, pkgspec, conf_file, qf=def_qf, en_repos=None, dis_r
 
         retpkgs = []
         pkgs = []
-        updates = []
 
         try:
-            my = yum_base(conf_file)
-            for rid in dis_repos:
-                my.repos.disableRepo(rid)
-            for rid in en_repos:
-                my.repos.enableRepo(rid)
+            session = query_session(module, repoq, conf_file, en_repos, dis_repos)
+            my = session.base()
 
             pkgs = my.returnPackagesByDep(pkgspec) + my.returnInstalledPackagesByDep(pkgspec)
             if not pkgs:
                 e,m,u = my.pkgSack.matchPackageNames([pkgspec])
                 pkgs = e + m
-            updates = my.doPackageLists(pkgnarrow='updates').updates 
+            for pkg in pkgs:
+                if session.is_update(pkg):
+                    retpkgs.append(pkg)
         except Exception:
             e = get_exception()
             module.fail_json(msg="Failure talking to yum: %s" % e)
 
-        for pkg in pkgs:
-            if pkg in updates:
-                retpkgs.append(pkg)
-            
         return set([ po_to_nevra(p) for p in retpkgs ])
 
+    elif use_snapshot and qf == def_qf and not pkgspec.startswith('-'):
+        session = query_session(module, repoq, conf_file, en_repos, dis_repos)
+        return set(session.lookup('updates', pkgspec))
+
     else:
         myrepoq = list(repoq)
         r_cmd = ['--disablerepo', ','.join(dis_repos)]
@@ -418,6 +593,7 @@ def is_update(module, repoq, pkgspec, conf_file, qf=def_qf, en_repos=None, dis_r
             
     return set()
 
+@memoized
 def what_provides(module, repoq, req_spec, conf_file,  qf=def_qf, en_repos=None, dis_repos=None):
     if en_repos is None:
         en_repos = []
@@ -435,11 +611,7 @@ def what_provides(module, repoq, req_spec, conf_file,  qf=def_qf, en_repos=None,
 
         pkgs = []
         try:
-            my = yum_base(conf_file)
-            for rid in dis_repos:
-                my.repos.disableRepo(rid)
-            for rid in en_repos:
-                my.repos.enableRepo(rid)
+            my = query_session(module, repoq, conf_file, en_repos, dis_repos).base()
 
             pkgs = my.returnPackagesByDep(req_spec) + my.returnInstalledPackagesByDep(req_spec)
             if not pkgs:
@@ -465,11 +637,18 @@ def what_provides(module, repoq, req_spec, conf_file,  qf=def_qf, en_repos=None,
 
         cmd = myrepoq + ["--qf", qf, "--whatprovides", req_spec]
         rc,out,err = module.run_command(cmd)
-        cmd = myrepoq + ["--qf", qf, req_spec]
-        rc2,out2,err2 = module.run_command(cmd)
+        if use_snapshot and qf == def_qf:
+            # the packages matching by name come from the listing of the session
+            out2, err2 = '', ''
+            rc2 = 0
+            pkgs = query_session(module, repoq, conf_file, en_repos, dis_repos).lookup('repos', req_spec)
+        else:
+            cmd = myrepoq + ["--qf", qf, req_spec]
+            rc2,out2,err2 = module.run_command(cmd)
+            pkgs = set()
         if rc == 0 and rc2 == 0:
             out += out2
-            pkgs = set([ p for p in out.split('\n') if p.strip() ])
+            pkgs = pkgs.union([ p for p in out.split('\n') if p.strip() ])
             if not pkgs:
                 pkgs = is_installed(module, repoq, req_spec, conf_file, qf=qf)
             return pkgs
@@ -706,6 +885,7 @@ def install(module, items, repoq, yum_basecmd, conf_file, en_repos, dis_repos):
 
         lang_env = dict(LANG='C', LC_ALL='C', LC_MESSAGES='C')
         rc, out, err = module.run_command(cmd, environ_update=lang_env)
+        invalidate_queries()
 
         if (rc == 1):
             for spec in items:
@@ -772,6 +952,7 @@ def remove(module, items, repoq, yum_basecmd, conf_file, en_repos, dis_repos):
             module.exit_json(changed=True, results=res['results'], changes=dict(removed=pkgs))
 
         rc, out, err = module.run_command(cmd)
+        invalidate_queries()
 
         res['rc'] = rc
         res['results'].append(out)
@@ -941,6 +1122,8 @@ def latest(module, items, repoq, yum_basecmd, conf_file, en_repos, dis_repos):
         else:
             rc2, out2, err2 = [0, '', '']
 
+    invalidate_queries()
+
     if not update_all:
         rc += rc2
         out += out2
@@ -989,6 +1172,9 @@ def ensure(module, state, pkgs, conf_file, enablerepo, disablerepo,
         e_cmd = ['--exclude=%s' % exclude]
         yum_basecmd.extend(e_cmd)
 
+    global use_snapshot
+    use_snapshot = len(pkgs) >= SNAPSHOT_MIN_SPECS
+
     if state in ['installed', 'present', 'latest']:
 
         if module.params.get('update_cache'):
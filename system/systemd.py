@@ -27,10 +27,21 @@ description:
     - Controls systemd services on remote hosts.
 options:
     name:
-        required: true
+        required: false
         description:
-            - Name of the service.
+            - Name of the service. Required unless I(units) is given.
         aliases: ['unit', 'service']
+    units:
+        required: false
+        default: null
+        version_added: "2.3"
+        description:
+            - A list of units to bring to the same I(state), I(enabled) and I(masked) settings, instead of
+              the single I(name).
+            - Their status is read with one C(systemctl show) call limited to the properties needed,
+              daemon-reload runs at most once, and each of mask, unmask, enable, disable, start, stop,
+              restart and reload runs as one C(systemctl) call for all the units that need it.
+            - Per unit results are returned in C(results).
     state:
         required: false
         default: null
@@ -65,7 +76,7 @@ options:
             - run systemctl talking to the service manager of the calling user, rather than the service manager
               of the system.
 notes:
-    - One option other than name is required.
+    - One option other than name or units is required.
 requirements:
     - A system managed by systemd
 '''
@@ -103,9 +114,26 @@ EXAMPLES = '''
     name: dnf-automatic.timer
     state: started
     enabled: True
+
+# Example action to start and enable a set of services in one task
+- systemd:
+    units:
+      - httpd
+      - crond
+      - sshd.service
+    state: started
+    enabled: yes
 '''
 
 RETURN = '''
+results:
+    description: With I(units), the result of each unit, with its name, whether it changed, the status
+        properties read and its enabled and state settings when requested
+    returned: success, with units
+    type: list
+    sample: [{"name": "crond", "changed": true, "enabled": true, "state": "started",
+              "status": {"ActiveState": "inactive", "Id": "crond.service", "LoadState": "loaded",
+                         "SubState": "dead", "UnitFileState": "disabled"}}]
 status:
     description: A dictionary with the key=value pairs returned from `systemctl show`
     returned: success
@@ -240,6 +268,139 @@ import glob
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils._text import to_bytes, to_native
 
+# the properties of systemctl show that units mode reads
+UNITS_PROPERTIES = ('Id', 'LoadState', 'LoadError', 'ActiveState', 'SubState', 'UnitFileState')
+
+# unit file states systemctl is-enabled reports as enabled, generated units
+# may come from an init script and are left to is_enabled()
+ENABLED_STATES = ('enabled', 'enabled-runtime', 'static', 'indirect', 'transient', 'alias')
+
+
+def is_enabled(module, systemctl, unit):
+    (rc, out, err) = module.run_command("%s is-enabled '%s'" % (systemctl, unit))
+
+    # check systemctl result or if it is a init script
+    if rc == 0:
+        return True
+    elif rc == 1:
+        # Deals with init scripts
+        # if both init script and unit file exist stdout should have enabled/disabled, otherwise use rc entries
+        initscript = '/etc/init.d/' + unit
+        if os.path.exists(initscript) and os.access(initscript, os.X_OK) and \
+           (not out.startswith('disabled') or bool(glob.glob('/etc/rc?.d/S??' + unit))):
+            return True
+    return False
+
+
+def run_batch(module, systemctl, action, units, results):
+    """ Run one systemctl action for all the units needing it """
+    if not units or module.check_mode:
+        return
+    (rc, out, err) = module.run_command("%s %s %s" % (systemctl, action, ' '.join(["'%s'" % u for u in units])))
+    if rc != 0:
+        module.fail_json(msg="Unable to %s units %s: %s" % (action, ', '.join(units), err), results=results)
+
+
+def manage_units(module, systemctl, units):
+    """
+    Bring all the units to the requested settings with one systemctl call
+    per step, and exit with the result of each
+    """
+
+    if not units:
+        # systemctl show without units would report on the manager itself
+        module.exit_json(changed=False, results=[])
+
+    cmd = "%s show %s %s" % (systemctl, ' '.join(['-p %s' % p for p in UNITS_PROPERTIES]),
+                             ' '.join(["'%s'" % u for u in units]))
+    (rc, out, err) = module.run_command(cmd)
+    if rc != 0:
+        module.fail_json(msg='failure %d running systemctl show for %s: %s' % (rc, ', '.join(units), err))
+
+    # one block of properties per unit, in the order given, separated by empty lines
+    statuses = []
+    status = None
+    for line in to_native(out).split('\n') + ['']:
+        if not line.strip():
+            if status is not None:
+                statuses.append(status)
+            status = None
+        elif '=' in line:
+            if status is None:
+                status = {}
+            k, v = line.split('=', 1)
+            status[k] = v.strip()
+    if len(statuses) != len(units):
+        module.fail_json(msg='systemctl show returned %d units out of %d' % (len(statuses), len(units)), stdout=out)
+
+    results = []
+    for unit, status in zip(units, statuses):
+        if status.get('LoadState') == 'not-found':
+            module.fail_json(msg='Could not find the requested service "%r"' % unit)
+        elif status.get('LoadError'):
+            module.fail_json(msg="Failed to get the service status '%s': %s" % (unit, status['LoadError']))
+        results.append({'name': unit, 'changed': False, 'status': status})
+
+    # mask/unmask the units, if requested
+    if module.params['masked'] is not None:
+        to_change = []
+        for result in results:
+            if (result['status'].get('LoadState') == 'masked') != module.params['masked']:
+                result['changed'] = True
+                to_change.append(result['name'])
+        if module.params['masked']:
+            run_batch(module, systemctl, 'mask', to_change, results)
+        else:
+            run_batch(module, systemctl, 'unmask', to_change, results)
+
+    # Enable/disable units startup at boot if requested
+    if module.params['enabled'] is not None:
+        to_change = []
+        for result in results:
+            unit_file_state = result['status'].get('UnitFileState')
+            if unit_file_state not in ('', None, 'generated') and \
+               not (unit_file_state == 'disabled' and os.path.exists('/etc/init.d/' + result['name'])):
+                enabled = unit_file_state in ENABLED_STATES
+            else:
+                # init scripts have no unit file, or one generated from them, and
+                # can be enabled through rc links whatever systemd says
+                enabled = is_enabled(module, systemctl, result['name'])
+            result['enabled'] = module.params['enabled']
+            if enabled != module.params['enabled']:
+                result['changed'] = True
+                to_change.append(result['name'])
+        if module.params['enabled']:
+            run_batch(module, systemctl, 'enable', to_change, results)
+        else:
+            run_batch(module, systemctl, 'disable', to_change, results)
+
+    if module.params['state'] is not None:
+        to_change = []
+        for result in results:
+            if 'ActiveState' not in result['status']:
+                module.fail_json(msg="Service is in unknown state", status=result['status'])
+            result['state'] = module.params['state']
+            if module.params['state'] == 'started':
+                change = result['status']['ActiveState'] != 'active'
+            elif module.params['state'] == 'stopped':
+                change = result['status']['ActiveState'] == 'active'
+            else:
+                result['state'] = 'started'
+                change = True
+            if change:
+                result['changed'] = True
+                to_change.append(result['name'])
+        if module.params['state'] == 'started':
+            action = 'start'
+        elif module.params['state'] == 'stopped':
+            action = 'stop'
+        else:
+            action = module.params['state'][:-2] # remove 'ed' from restarted/reloaded
+        run_batch(module, systemctl, action, to_change, results)
+
+    changed = bool([r for r in results if r['changed']])
+    module.exit_json(changed=changed, results=results)
+
 # ===========================================
 # Main control flow
 
@@ -247,7 +408,8 @@ def main():
     # init
     module = AnsibleModule(
         argument_spec = dict(
-                name = dict(required=True, type='str', aliases=['unit', 'service']),
+                name = dict(type='str', aliases=['unit', 'service']),
+                units = dict(type='list'),
                 state = dict(choices=[ 'started', 'stopped', 'restarted', 'reloaded'], type='str'),
                 enabled = dict(type='bool'),
                 masked = dict(type='bool'),
@@ -255,7 +417,8 @@ def main():
                 user= dict(type='bool', default=False),
             ),
             supports_check_mode=True,
-            required_one_of=[['state', 'enabled', 'masked', 'daemon_reload']],
+            required_one_of=[['state', 'enabled', 'masked', 'daemon_reload'], ['name', 'units']],
+            mutually_exclusive=[['name', 'units']],
         )
 
     # initialize
@@ -277,6 +440,9 @@ def main():
         if rc != 0:
             module.fail_json(msg='failure %d during daemon-reload: %s' % (rc, err))
 
+    if module.params['units'] is not None:
+        manage_units(module, systemctl, module.params['units'])
+
     #TODO: check if service exists
     (rc, out, err) = module.run_command("%s show '%s'" % (systemctl, unit))
     if rc != 0:
@@ -330,19 +496,7 @@ def main():
     # Enable/disable service startup at boot if requested
     if module.params['enabled'] is not None:
         # do we need to enable the service?
-        enabled = False
-        (rc, out, err) = module.run_command("%s is-enabled '%s'" % (systemctl, unit))
-
-        # check systemctl result or if it is a init script
-        if rc == 0:
-            enabled = True
-        elif rc == 1:
-            # Deals with init scripts
-            # if both init script and unit file exist stdout should have enabled/disabled, otherwise use rc entries
-            initscript = '/etc/init.d/' + unit
-            if os.path.exists(initscript) and os.access(initscript, os.X_OK) and \
-               (not out.startswith('disabled') or bool(glob.glob('/etc/rc?.d/S??' + unit))):
-                enabled = True
+        enabled = is_enabled(module, systemctl, unit)
 
         # default to current state
         result['enabled'] = enabled
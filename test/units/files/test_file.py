@@ -0,0 +1,50 @@
+import os
+import stat
+
+import pytest
+
+pytest.importorskip('ansible.module_utils.basic')
+importlib_util = pytest.importorskip('importlib.util')
+
+MODULE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'files', 'file.py')
+spec = importlib_util.spec_from_file_location('file', MODULE_PATH)
+file_module = importlib_util.module_from_spec(spec)
+spec.loader.exec_module(file_module)
+
+
+class FailJson(Exception):
+    pass
+
+
+class FakeModule(object):
+    check_mode = False
+
+    def fail_json(self, **kwargs):
+        raise FailJson(kwargs['msg'])
+
+    def selinux_enabled(self):
+        return False
+
+
+def file_args(**kwargs):
+    args = dict(secontext=[None, None, None, None], attributes=None, mode=None, owner=None, group=None)
+    args.update(kwargs)
+    return args
+
+
+@pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() != 0, reason='chown needs root')
+def test_bulk_set_attributes_setuid_after_chown(tmpdir):
+    target = tmpdir.join('target')
+    target.write('data')
+    target.chmod(0o4755)
+    b_path = str(tmpdir).encode()
+    args = file_args(owner='65534', mode='04755')
+
+    changed, examined = file_module.bulk_set_attributes(FakeModule(), b_path, False, args)
+    st = os.lstat(str(target))
+    assert changed == 1
+    assert st.st_uid == 65534
+    assert stat.S_IMODE(st.st_mode) == 0o4755
+
+    changed, examined = file_module.bulk_set_attributes(FakeModule(), b_path, False, args)
+    assert changed == 0
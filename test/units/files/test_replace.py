@@ -0,0 +1,56 @@
+import os
+import re
+
+import pytest
+
+pytest.importorskip('ansible.module_utils.basic')
+importlib_util = pytest.importorskip('importlib.util')
+
+MODULE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'files', 'replace.py')
+spec = importlib_util.spec_from_file_location('replace', MODULE_PATH)
+replace = importlib_util.module_from_spec(spec)
+spec.loader.exec_module(replace)
+
+
+class FailJson(Exception):
+    pass
+
+
+class FakeModule(object):
+    def fail_json(self, **kwargs):
+        raise FailJson(kwargs['msg'])
+
+
+def run(tmpdir, data, regexp, span, chunk_size, monkeypatch):
+    monkeypatch.setattr(replace, 'CHUNK_SIZE', chunk_size)
+    dest = tmpdir.join('dest')
+    dest.write_binary(data)
+    tmpfile, count, differs = replace.stream_replace(FakeModule(), re.compile(regexp, re.M),
+                                                     b'X', str(dest), span)
+    f = open(tmpfile, 'rb')
+    try:
+        return f.read()
+    finally:
+        f.close()
+        os.unlink(tmpfile)
+
+
+def test_stream_replace_across_chunks(tmpdir, monkeypatch):
+    data = b''.join([b'line %d key=value\n' % i for i in range(200)])
+    result = run(tmpdir, data, b'key=[^\n]*', 16, 16, monkeypatch)
+    assert result == re.sub(b'key=[^\n]*', b'X', data)
+
+
+def test_stream_replace_match_longer_than_span(tmpdir, monkeypatch):
+    data = b'start key=' + b'v' * 100 + b'\nend\n'
+    with pytest.raises(FailJson) as excinfo:
+        run(tmpdir, data, b'key=[^\n]*', 16, 16, monkeypatch)
+    assert 'max_match_span' in str(excinfo.value)
+    assert tmpdir.join('dest').read_binary() == data
+    assert tmpdir.listdir() == [tmpdir.join('dest')]
+
+
+def test_stream_replace_long_match_before_short_one(tmpdir, monkeypatch):
+    data = b'key=' + b'v' * 40 + b'\nkey=w\n'
+    with pytest.raises(FailJson):
+        run(tmpdir, data, b'key=[^\n]*\n', 16, 16, monkeypatch)
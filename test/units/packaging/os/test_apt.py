@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+pytest.importorskip('ansible.module_utils.basic')
+importlib_util = pytest.importorskip('importlib.util')
+
+MODULE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'packaging', 'os', 'apt.py')
+spec = importlib_util.spec_from_file_location('apt_module', MODULE_PATH)
+apt_module = importlib_util.module_from_spec(spec)
+spec.loader.exec_module(apt_module)
+
+STATUS = u'''Package: libfoo1
+Status: install ok installed
+Priority: optional
+Maintainer: Jörg Müller <jorg@example.org>
+Architecture: amd64
+Multi-Arch: same
+Version: 1.2-3
+Description: foo library
+ Ünïcode in the long description too.
+
+Package: libfoo1
+Status: deinstall ok config-files
+Architecture: i386
+Version: 1.1-1
+
+Package: bar
+Status: install ok half-installed
+Architecture: all
+Version: 0.9
+'''
+
+
+def test_read_dpkg_status_utf8(tmpdir):
+    status = tmpdir.join('status')
+    status.write_binary(STATUS.encode('utf-8'))
+    assert apt_module.read_dpkg_status(str(status)) == {
+        'libfoo1': [('amd64', 'installed', '1.2-3'), ('i386', 'config-files', '1.1-1')],
+        'bar': [('all', 'half-installed', '0.9')],
+    }
+
+
+def test_read_dpkg_status_latin1(tmpdir):
+    status = tmpdir.join('status')
+    status.write_binary(STATUS.encode('latin-1'))
+    assert apt_module.read_dpkg_status(str(status))['bar'] == [('all', 'half-installed', '0.9')]